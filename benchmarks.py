@@ -0,0 +1,322 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from forex_tools import mt5_replay, rate_provider
+from forex_tools.bar_engine import BarBuilder, resample_ticks
+from forex_tools.bookoo_backtest_engine import PIP, evaluate_performance, simulate_trades, stream_trades
+from forex_tools.tick_store import Ticks, ticks_to_dataframe
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_TICKS = 1_000_000
+DEFAULT_REPEAT = 5  # Timed runs per case, the median counts
+DEFAULT_THRESHOLD = 0.25  # Allowed relative loss of throughput / growth of peak memory
+MEMORY_SLACK_MB = 1.0  # Peak memory changes below this are noise
+SL_PIPS = 2
+SIZING_CALLS = 20_000
+ORDER_CALLS = 20_000
+CLI_STARTS = 5
+SIZING_SYMBOLS = ["EURUSD", "GBPUSD", "USDJPY", "AUDUSD", "USDCHF"]
+
+
+def iter_synthetic_ticks(n, seed=0, chunk_rows=1_000_000, start="2023-01-02", price=1.08, spread_pips=0.6,
+                         volatility_pips=0.3, mean_interval_ms=250, pip=PIP):
+    """
+    Seeded random walk of ticks, generated chunk by chunk so 100M ticks need no more memory than 1M.
+
+    The mid price moves by a normal step of volatility_pips per tick, bid and
+    ask sit spread_pips apart around it and the time between ticks is
+    exponential. Prices and times come from separate streams of the seed, so
+    the ticks are the same whatever chunk_rows is.
+
+    :param n: Number of ticks
+    :return: Generator of Ticks(timestamp, bid, ask), timestamp in ms since epoch.
+    """
+    price_rng, time_rng = (np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(2))
+    timestamp = pd.Timestamp(start).value // 1_000_000
+    half_spread = spread_pips * pip / 2
+    for row in range(0, n, chunk_rows):
+        count = min(chunk_rows, n - row)
+        # Summed on from the previous chunk's last price, so chunking doesn't change the rounding
+        mid = np.cumsum(np.concatenate(([price], price_rng.normal(0, volatility_pips * pip, count))))[1:]
+        timestamps = timestamp + np.cumsum(time_rng.exponential(mean_interval_ms, count).astype(np.int64) + 1)
+        price, timestamp = mid[-1], timestamps[-1]
+        yield Ticks(timestamps, mid - half_spread, mid + half_spread)
+
+
+def synthetic_ticks(n, seed=0, **kwargs):
+    """
+    All of iter_synthetic_ticks in one Ticks of arrays.
+    """
+    chunks = list(iter_synthetic_ticks(n, seed, **kwargs))
+    return Ticks(*(np.concatenate(column) for column in zip(*chunks)))
+
+
+def synthetic_outcomes(n, seed=0, win_ratio=0.25):
+    """
+    Seeded list of 'win'/'lose' outcomes, as simulate_trades returns them.
+    """
+    wins = np.random.default_rng(seed).random(n) < win_ratio
+    return ['win' if is_win else 'lose' for is_win in wins]
+
+
+class _RequestOnlyTerminal(mt5_replay.ReplayTerminal):
+    # order_send accepts every request without opening a position, so only building it is timed
+    def order_send(self, request):
+        return mt5_replay.OrderSendResult(retcode=self.TRADE_RETCODE_DONE, deal=0, order=0, volume=request["volume"],
+                                          price=request["price"], bid=0.0, ask=0.0, comment="Request executed",
+                                          request_id=0, retcode_external=0, request=request)
+
+
+def _mock_mt5():
+    terminal = _RequestOnlyTerminal({symbol: synthetic_ticks(1_000, price=150.0 if symbol.endswith("JPY") else 1.08, pip=0.01 if symbol.endswith("JPY") else PIP)
+                                     for symbol in SIZING_SYMBOLS})
+    mt5_replay.install(terminal)
+    rate_provider.configure(source=lambda symbols: {symbol: 1.1 for symbol in symbols})
+    return terminal
+
+
+# Every case takes the tick count and seed and returns (run, items, unit), run doing the measured work once
+
+def case_simulate_trades(ticks, seed):
+    frame = ticks_to_dataframe(synthetic_ticks(ticks, seed))
+    return lambda: simulate_trades(frame, SL_PIPS), ticks, "ticks"
+
+
+def case_stream_trades(ticks, seed):
+    # Includes generating the ticks, the in-memory frame of 100M ticks would not fit
+    def run():
+        for _ in stream_trades(iter_synthetic_ticks(ticks, seed), SL_PIPS):
+            pass
+    return run, ticks, "ticks"
+
+
+def case_evaluate_performance(ticks, seed):
+    outcomes = synthetic_outcomes(ticks, seed)
+    return lambda: evaluate_performance(outcomes), ticks, "trades"
+
+
+def case_calculate_lot_size(ticks, seed):
+    _mock_mt5()
+    from forex_tools import forex_calculators
+    rng = np.random.default_rng(seed)
+    rows = list(zip(rng.uniform(1_000, 100_000, SIZING_CALLS), rng.uniform(2, 50, SIZING_CALLS),
+                    rng.choice(SIZING_SYMBOLS, SIZING_CALLS)))
+
+    def run():
+        for balance, stop_loss, symbol in rows:
+            forex_calculators.calculate_lot_size(balance, 1, stop_loss, symbol)
+    return run, SIZING_CALLS, "calls"
+
+
+def case_forex_trade_calculator(ticks, seed):
+    bot = mt5_replay.load_bot(_mock_mt5())
+    rng = np.random.default_rng(seed)
+    rows = list(zip(rng.uniform(1_000, 100_000, SIZING_CALLS), rng.uniform(2, 50, SIZING_CALLS),
+                    rng.choice(SIZING_SYMBOLS, SIZING_CALLS)))
+
+    def run():
+        for balance, stop_loss, symbol in rows:
+            bot.forex_trade_calculator(symbol, 5, "EUR", balance, 1, stop_loss)
+    return run, SIZING_CALLS, "calls"
+
+
+def case_create_mt5_order(ticks, seed):
+    mt5_replay.load_bot(_mock_mt5())
+    from forex_tools import mt5_dao
+    rng = np.random.default_rng(seed)
+    rows = list(zip(rng.choice(SIZING_SYMBOLS, ORDER_CALLS), rng.random(ORDER_CALLS) < 0.5, rng.uniform(2, 50, ORDER_CALLS)))
+
+    def run():
+        for symbol, is_buy, stop_loss in rows:
+            mt5_dao.create_mt5_order(0.1, symbol, is_buy, stop_loss)
+    return run, ORDER_CALLS, "calls"
+
+
+def case_prepare_order(ticks, seed):
+    _mock_mt5()
+    from forex_tools import mt5_dao
+    mt5_dao.mt5 = sys.modules["MetaTrader5"]
+    mt5_dao.invalidate_symbol_info()
+    rng = np.random.default_rng(seed)
+    rows = list(zip(rng.choice(SIZING_SYMBOLS, ORDER_CALLS), rng.random(ORDER_CALLS) < 0.5, rng.uniform(2, 50, ORDER_CALLS)))
+
+    def run():
+        for symbol, is_buy, stop_loss in rows:
+            mt5_dao.prepare_order(0.1, symbol, is_buy, stop_loss)
+    return run, ORDER_CALLS, "calls"
+
+
+def case_send_order(ticks, seed):
+    # The entry path once the template is prepared: price, SL/TP and order_send
+    mt5_replay.load_bot(_mock_mt5())
+    from forex_tools import mt5_dao
+    rng = np.random.default_rng(seed)
+    templates = [mt5_dao.prepare_order(0.1, symbol, is_buy, stop_loss) for symbol, is_buy, stop_loss
+                 in zip(rng.choice(SIZING_SYMBOLS, ORDER_CALLS), rng.random(ORDER_CALLS) < 0.5, rng.uniform(2, 50, ORDER_CALLS))]
+
+    def run():
+        for template in templates:
+            mt5_dao.send_order(template)
+    return run, ORDER_CALLS, "calls"
+
+
+def case_resample_ticks(ticks, seed):
+    synthetic = synthetic_ticks(ticks, seed)
+    return lambda: resample_ticks(synthetic, "1min"), ticks, "ticks"
+
+
+def case_bar_builder(ticks, seed):
+    # Tick by tick, as the live bot would feed it
+    synthetic = synthetic_ticks(ticks, seed)
+    rows = list(zip(synthetic.timestamp.tolist(), synthetic.bid.tolist(), synthetic.ask.tolist()))
+
+    def run():
+        builder = BarBuilder("1min", max_bars=1_000)
+        for timestamp, bid, ask in rows:
+            builder.update(timestamp, bid, ask)
+    return run, ticks, "ticks"
+
+
+def _cli_case(*arguments):
+    # Cold start of the command in a fresh interpreter, imports included
+    def run():
+        for _ in range(CLI_STARTS):
+            subprocess.run([sys.executable, "-m", "forex_tools", *arguments], check=True, stdout=subprocess.DEVNULL,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+    return run, CLI_STARTS, "starts"
+
+
+def case_cli_size(ticks, seed):
+    # Rates given, so nothing is fetched
+    return _cli_case("size", "USDJPY", "--balance", "10000", "--sl-pips", "10", "--leverage", "30",
+                     "--rate", "EURJPY=X=162.3", "--rate", "EURUSD=X=1.08")
+
+
+def case_cli_backtest_help(ticks, seed):
+    # Loading the backtest modules, without reading any ticks
+    return _cli_case("backtest", "--help")
+
+
+CASES = {
+    "simulate_trades": case_simulate_trades,
+    "stream_trades": case_stream_trades,
+    "evaluate_performance": case_evaluate_performance,
+    "calculate_lot_size": case_calculate_lot_size,
+    "forex_trade_calculator": case_forex_trade_calculator,
+    "create_mt5_order": case_create_mt5_order,
+    "prepare_order": case_prepare_order,
+    "send_order": case_send_order,
+    "resample_ticks": case_resample_ticks,
+    "bar_builder": case_bar_builder,
+    "cli_size": case_cli_size,
+    "cli_backtest_help": case_cli_backtest_help,
+}
+
+
+def measure(case, ticks=DEFAULT_TICKS, seed=0, repeat=DEFAULT_REPEAT):
+    """
+    Runs one case, timing the median of repeat runs and tracing the peak memory of one more.
+
+    The median keeps one run slowed down (or sped up) by the machine from deciding the result.
+
+    :return: Dictionary with items, unit, seconds, throughput (items per second) and peak_mb.
+    """
+    run, items, unit = case(ticks, seed)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+
+    # Timed separately, tracing slows Python code down a lot
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"items": items, "unit": unit, "seconds": seconds, "throughput": items / seconds, "peak_mb": peak / 2 ** 20}
+
+
+def run_benchmarks(names=None, ticks=DEFAULT_TICKS, seed=0, repeat=DEFAULT_REPEAT):
+    results = {}
+    for name in names or CASES:
+        results[name] = measure(CASES[name], ticks, seed, repeat)
+        print(f"{name:24} {results[name]['throughput']:14,.0f} {results[name]['unit']}/s"
+              f" {results[name]['peak_mb']:10.1f} MB peak")
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Checks results against a baseline.
+
+    :return: List of regression messages, empty when nothing got slower or hungrier than the threshold allows.
+        A case missing from the baseline or recorded with another item count is a failure too, it would
+        otherwise pass without being compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            regressions.append(f"{name}: not in the baseline, record it with --save")
+            continue
+        if base["items"] != result["items"]:
+            regressions.append(f"{name}: ran {result['items']} {result['unit']}, baseline {base['items']}; "
+                               f"rerun with the baseline's --ticks or record a new one with --save")
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            regressions.append(f"{name}: {result['throughput']:,.0f} {result['unit']}/s, baseline {base['throughput']:,.0f}")
+        if result["peak_mb"] > base["peak_mb"] * (1 + threshold) + MEMORY_SLACK_MB:
+            regressions.append(f"{name}: {result['peak_mb']:.1f} MB peak, baseline {base['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backtest, sizing and order code on synthetic ticks")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="Ticks (or trades) per backtest case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per case, the median counts")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="Cases to run, all by default")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed relative throughput loss / peak memory growth before failing")
+    parser.add_argument("--save", action="store_true", help="Write the results into the baseline instead of comparing")
+    args = parser.parse_args()
+    if not args.save and not os.path.exists(args.baseline):
+        parser.error(f"no baseline at {args.baseline}, record one on this machine with --save first")
+
+    results = run_benchmarks(args.only, args.ticks, args.seed, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                       "results": baseline}, f, indent=1)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
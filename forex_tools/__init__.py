@@ -0,0 +1,5 @@
+"""
+Position sizing, tick backtests and the Bookoo MetaTrader 5 bot.
+
+Kept empty so `forex-tools size` imports nothing but the modules it needs.
+"""
@@ -0,0 +1,239 @@
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+# One bar, and a series of bars as arrays; time is the bar's open time in ms since epoch, volume its tick count
+Bar = namedtuple("Bar", ["time", "open", "high", "low", "close", "volume"])
+Bars = namedtuple("Bars", ["time", "open", "high", "low", "close", "volume"])
+
+# Fill gap candles of bookoo_indicator.pine: open is the previous bar's close, bullish when open <= close
+FillGapBars = namedtuple("FillGapBars", ["time", "open", "high", "low", "close", "bullish"])
+
+PRICES = ("bid", "ask", "mid")
+
+
+def timeframe_ms(timeframe):
+    """
+    Length of a timeframe in ms, from ms or anything pd.Timedelta reads, e.g. '1min', '15min', '4h'.
+    """
+    if isinstance(timeframe, (int, np.integer)):
+        length = int(timeframe)
+    else:
+        length = pd.Timedelta(timeframe) // pd.Timedelta(milliseconds=1)
+    if length <= 0:
+        raise ValueError(f"Timeframe must be positive, got {timeframe}")
+    return length
+
+
+def _prices(bid, ask, price):
+    if price == "bid":
+        return np.asarray(bid, dtype=np.float64)
+    if price == "ask":
+        return np.asarray(ask, dtype=np.float64)
+    if price == "mid":
+        return (np.asarray(bid, dtype=np.float64) + np.asarray(ask, dtype=np.float64)) / 2
+    raise ValueError(f"price must be one of {PRICES}, got {price}")
+
+
+def _empty_bars():
+    return Bars(np.empty(0, dtype=np.int64), *(np.empty(0, dtype=np.float64) for _ in range(4)), np.empty(0, dtype=np.int64))
+
+
+def resample_prices(timestamps, prices, timeframe):
+    """
+    Aggregates a time-ordered price series into OHLC bars in one pass of numpy reductions.
+
+    Bars start at multiples of the timeframe since the epoch (so daily and
+    shorter timeframes start at midnight). Like MT5 charts, periods without
+    ticks have no bar.
+
+    :param timestamps: Tick times in ms since epoch, ascending
+    :param prices: Tick prices
+    :param timeframe: Bar length, see timeframe_ms
+    :return: Bars of arrays, one element per bar.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(timestamps) == 0:
+        return _empty_bars()
+    length = timeframe_ms(timeframe)
+    buckets = timestamps // length
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(prices))
+    return Bars(
+        time=buckets[starts] * length,
+        open=prices[starts],
+        high=np.maximum.reduceat(prices, starts),
+        low=np.minimum.reduceat(prices, starts),
+        close=prices[ends - 1],
+        volume=ends - starts,
+    )
+
+
+def resample_ticks(ticks, timeframe, price="bid"):
+    """
+    Batch OHLC bars of Ticks(timestamp, bid, ask), e.g. from tick_store.load_ticks.
+
+    :param price: 'bid' (what MT5 charts show), 'ask' or 'mid'
+    """
+    return resample_prices(ticks.timestamp, _prices(ticks.bid, ticks.ask, price), timeframe)
+
+
+def bars_from_rows(rows):
+    """
+    Bars of arrays from a sequence of Bar, e.g. BarBuilder.bars.
+    """
+    if not rows:
+        return _empty_bars()
+    columns = list(zip(*rows))
+    return Bars(np.array(columns[0], dtype=np.int64), *(np.array(column, dtype=np.float64) for column in columns[1:5]),
+                np.array(columns[5], dtype=np.int64))
+
+
+def bars_to_dataframe(bars):
+    """
+    DataFrame of Bars (or a sequence of Bar) indexed by open time, with open, high, low, close and volume columns.
+    """
+    if not isinstance(bars, Bars):
+        bars = bars_from_rows(list(bars))
+    columns = bars._asdict()
+    index = pd.DatetimeIndex(np.asarray(columns.pop("time"), dtype=np.int64).astype("datetime64[ms]"), name="time")
+    return pd.DataFrame(columns, index=index)
+
+
+def fill_gap_candles(bars):
+    """
+    Python port of bookoo_indicator.pine: candles whose open is the previous bar's close.
+
+    High, low and close are the bar's own. A candle is bullish when its open is
+    at or below its close. The first candle has no previous close, so its open
+    is NaN and, like a comparison with na in Pine, it is not bullish.
+
+    :param bars: Bars, e.g. from resample_ticks or BarBuilder.to_bars
+    :return: FillGapBars of arrays.
+    """
+    close = np.asarray(bars.close, dtype=np.float64)
+    new_open = np.concatenate(([np.nan], close[:-1]))
+    with np.errstate(invalid="ignore"):
+        bullish = new_open <= close
+    return FillGapBars(np.asarray(bars.time), new_open, np.asarray(bars.high), np.asarray(bars.low), close, bullish)
+
+
+class BarBuilder:
+    """
+    Streaming OHLC bars of one symbol, updated tick by tick in O(1).
+
+    The forming bar is kept in plain attributes and only turned into a Bar once
+    a tick of a later period arrives. Completed bars go into the bars deque (the
+    newest max_bars of them) and to on_bar, so a strategy or dashboard reads
+    bars without resampling the history again. update_many feeds a whole chunk
+    of ticks through resample_prices and gives the same bars as update.
+
+    :param timeframe: Bar length, see timeframe_ms
+    :param price: 'bid', 'ask' or 'mid'
+    :param max_bars: Number of completed bars kept, None keeps all
+    :param on_bar: Called with every completed Bar
+    """
+
+    def __init__(self, timeframe, price="bid", max_bars=None, on_bar=None):
+        if price not in PRICES:
+            raise ValueError(f"price must be one of {PRICES}, got {price}")
+        self.length = timeframe_ms(timeframe)
+        self.price = price
+        self.on_bar = on_bar
+        self.bars = deque(maxlen=max_bars)
+        self.previous_close = np.nan  # Close of the last completed bar, the open of the forming fill gap candle
+        self._bucket = None
+        self._open = self._high = self._low = self._close = np.nan
+        self._volume = 0
+
+    def _complete(self):
+        bar = Bar(self._bucket * self.length, self._open, self._high, self._low, self._close, self._volume)
+        self.bars.append(bar)
+        self.previous_close = self._close
+        if self.on_bar is not None:
+            self.on_bar(bar)
+        return bar
+
+    def _price(self, bid, ask):
+        if self.price == "bid":
+            return bid
+        if self.price == "ask":
+            return ask
+        return (bid + ask) / 2
+
+    def update(self, timestamp, bid, ask):
+        """
+        Adds one tick, timestamp in ms since epoch.
+
+        :return: The Bar the tick completed, or None while the forming bar continues.
+        """
+        price = self._price(bid, ask)
+        bucket = timestamp // self.length
+        if bucket == self._bucket:
+            if price > self._high:
+                self._high = price
+            elif price < self._low:
+                self._low = price
+            self._close = price
+            self._volume += 1
+            return None
+
+        completed = self._complete() if self._bucket is not None else None
+        self._bucket = bucket
+        self._open = self._high = self._low = self._close = price
+        self._volume = 1
+        return completed
+
+    def update_many(self, timestamps, bid, ask):
+        """
+        Adds a chunk of ticks at once.
+
+        :return: List of the Bars the chunk completed.
+        """
+        chunk = resample_prices(timestamps, _prices(bid, ask, self.price), self.length)
+        if len(chunk.time) == 0:
+            return []
+        completed = []
+        first = 0
+        if chunk.time[0] // self.length == self._bucket:
+            self._high = max(self._high, chunk.high[0])
+            self._low = min(self._low, chunk.low[0])
+            self._close = chunk.close[0]
+            self._volume += int(chunk.volume[0])
+            first = 1
+        for i in range(first, len(chunk.time)):
+            if self._bucket is not None:
+                completed.append(self._complete())
+            self._bucket = int(chunk.time[i]) // self.length
+            self._open, self._high, self._low, self._close = (float(chunk.open[i]), float(chunk.high[i]),
+                                                              float(chunk.low[i]), float(chunk.close[i]))
+            self._volume = int(chunk.volume[i])
+        return completed
+
+    @property
+    def current(self):
+        """
+        The forming bar, None before the first tick.
+        """
+        if self._bucket is None:
+            return None
+        return Bar(self._bucket * self.length, self._open, self._high, self._low, self._close, self._volume)
+
+    def fill_gap(self):
+        """
+        Fill gap candle of the forming bar as (open, high, low, close, bullish), None before the first tick.
+        """
+        if self._bucket is None:
+            return None
+        return self.previous_close, self._high, self._low, self._close, bool(self.previous_close <= self._close)
+
+    def to_bars(self, include_current=False):
+        """
+        The kept completed bars, plus the forming one if asked, as Bars of arrays.
+        """
+        rows = list(self.bars)
+        if include_current and self._bucket is not None:
+            rows.append(self.current)
+        return bars_from_rows(rows)
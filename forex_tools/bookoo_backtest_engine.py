@@ -0,0 +1,331 @@
+import numpy as np
+import pandas as pd
+
+from .session_calendar import SessionCalendar
+
+PIP = 0.0001
+RR_RATIO = 3
+
+# First window scanned for an exit; doubled on every miss so a trade costs
+# O(log(length)) numpy calls instead of one Python iteration per tick.
+FIRST_PASSAGE_WINDOW = 256
+
+LONG = 1
+SHORT = -1
+
+
+def _direction_code(direction):
+    return LONG if direction == 'long' else SHORT
+
+
+def _direction_name(code):
+    return 'long' if code == LONG else 'short'
+
+
+def find_first_passage(prices, start, upper, lower, window=FIRST_PASSAGE_WINDOW):
+    """
+    Finds the first index at or after start where the price touches one of the barriers.
+
+    :param prices: 1-D float array the barriers are checked against
+    :param start: First index to check
+    :param upper: Exit when price >= upper
+    :param lower: Exit when price <= lower
+    :return: Index of the first touching tick, or -1 if the barriers are never touched.
+    """
+    n = len(prices)
+    while start < n:
+        stop = min(start + window, n)
+        chunk = prices[start:stop]
+        hits = np.flatnonzero((chunk >= upper) | (chunk <= lower))
+        if hits.size:
+            return start + int(hits[0])
+        start = stop
+        window *= 2
+    return -1
+
+
+def new_position_state(sl_pip, pip=PIP, start_direction='short', rr_ratio=RR_RATIO):
+    """
+    Strategy state carried from one chunk of ticks to the next by scan_ticks.
+    """
+    return {
+        'stop_loss': sl_pip * pip,
+        'take_profit': sl_pip * rr_ratio * pip,
+        'direction': _direction_code(start_direction),
+        'entry_price': None,   # None until the first tick opened the first position
+        'entry_offset': None,  # Global tick number of the entry
+        'entry_time': None,
+        'exit_pending': False,  # Barrier touched on the last tick, booked on the next one
+        'offset': 0,            # Ticks consumed by previous chunks
+    }
+
+
+def scan_ticks(bid, ask, state, timestamps=None):
+    """
+    Runs the Bookoo flip-on-loss strategy over one chunk of bid/ask arrays.
+
+    Reproduces simulate_trades_iterrows tick for tick: an exit is detected on
+    tick j, the trade is booked (and the next one entered) on tick j + 1 with
+    the entry price taken on the side of the direction that just closed.
+    Feeding a series in several chunks gives the same trades as feeding it at once.
+
+    :param bid: bid prices as a 1-D float array
+    :param ask: ask prices as a 1-D float array
+    :param state: Dict from new_position_state, updated in place
+    :param timestamps: Optional tick times, when given the entry time of every trade is returned too
+    :return: List of (entry_offset, exit_offset, entry_time, entry_price, exit_price, direction, is_win)
+        tuples of the trades booked in this chunk; offsets count ticks from the start of the series.
+    """
+    n = len(bid)
+    base = state['offset']
+    stop_loss = state['stop_loss']
+    take_profit = state['take_profit']
+    direction = state['direction']
+    entry_price = state['entry_price']
+    entry_offset = state['entry_offset']
+    entry_time = state['entry_time']
+    booked = []
+    if n == 0:
+        return booked
+
+    book_idx = 0 if state['exit_pending'] else None
+    search_from = 0
+    if entry_price is None:
+        entry_price = ask[0] if direction == LONG else bid[0]
+        entry_offset = base
+        entry_time = None if timestamps is None else timestamps[0]
+        search_from = 1
+    state['exit_pending'] = False
+
+    while True:
+        if book_idx is not None:
+            if direction == LONG:
+                exit_price = bid[book_idx]
+                is_win = exit_price >= entry_price
+            else:
+                exit_price = ask[book_idx]
+                is_win = exit_price <= entry_price
+            booked.append((entry_offset, base + book_idx, entry_time, entry_price, exit_price, direction, is_win))
+
+            entry_price = ask[book_idx] if direction == LONG else bid[book_idx]
+            entry_offset = base + book_idx
+            entry_time = None if timestamps is None else timestamps[book_idx]
+            if not is_win:
+                direction = -direction
+            search_from = book_idx + 1
+
+        if direction == LONG:
+            hit = find_first_passage(bid, search_from, entry_price + take_profit, entry_price - stop_loss)
+        else:
+            hit = find_first_passage(ask, search_from, entry_price + stop_loss, entry_price - take_profit)
+        if hit < 0:
+            break
+        book_idx = hit + 1
+        if book_idx >= n:
+            state['exit_pending'] = True
+            break
+
+    state['direction'] = direction
+    state['entry_price'] = entry_price
+    state['entry_offset'] = entry_offset
+    state['entry_time'] = entry_time
+    state['offset'] = base + n
+    return booked
+
+
+def first_passage_trades(bid, ask, sl_pip, pip=PIP, start_direction='short', rr_ratio=RR_RATIO):
+    """
+    Runs the Bookoo flip-on-loss strategy over whole bid/ask arrays.
+
+    :param bid: bid prices as a 1-D float array
+    :param ask: ask prices as a 1-D float array
+    :param sl_pip: Stop loss in pips
+    :param pip: Price size of one pip
+    :param start_direction: 'long' or 'short' for the first position
+    :param rr_ratio: Take profit as a multiple of the stop loss
+    :return: (entry_idx, exit_idx, entry_price, direction, is_win) arrays, one element per closed trade.
+    """
+    bid = np.asarray(bid, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    state = new_position_state(sl_pip, pip=pip, start_direction=start_direction, rr_ratio=rr_ratio)
+    booked = scan_ticks(bid, ask, state)
+    entries, exits, _, prices, _, directions, wins = zip(*booked) if booked else ([],) * 7
+    return (np.array(entries, dtype=np.int64), np.array(exits, dtype=np.int64), np.array(prices, dtype=np.float64),
+            np.array(directions, dtype=np.int8), np.array(wins, dtype=bool))
+
+
+def simulate_trades(df, sl_pip, rr_ratio=RR_RATIO, start_direction='short', session=None, calendar=None, pip=PIP):
+    """
+    Vectorized replacement of simulate_trades_iterrows with the same output.
+
+    :param df: Tick DataFrame indexed by timestamp with bidPrice and askPrice columns
+    :param sl_pip: Stop loss in pips
+    :param rr_ratio: Take profit as a multiple of the stop loss
+    :param start_direction: 'long' or 'short' for the first position
+    :param session: Only trade the ticks of this session on trading days (see session_calendar.SESSIONS),
+        like the commented out London filter of the original loop; None trades every tick
+    :param calendar: SessionCalendar of df's ticks, e.g. tick_store.load_calendar with the same start and end;
+        built on the fly if None
+    :param pip: Price size of one pip, 0.01 for JPY quoted pairs
+    :return: (trades, trade_details) exactly as simulate_trades_iterrows returns them.
+    """
+    if calendar is not None and calendar.rows != len(df):
+        raise ValueError(f"The calendar indexes {calendar.rows} ticks but df has {len(df)}, build it from the same ticks")
+    if session is not None:
+        if calendar is None:
+            calendar = SessionCalendar.build(df.index.values.astype('datetime64[ms]').astype(np.int64))
+        df = df.iloc[calendar.mask(session)]
+    bid = df['bidPrice'].to_numpy(dtype=np.float64)
+    ask = df['askPrice'].to_numpy(dtype=np.float64)
+    entry_idx, exit_idx, entry_prices, directions, wins = first_passage_trades(
+        bid, ask, sl_pip, pip=pip, start_direction=start_direction, rr_ratio=rr_ratio)
+
+    entry_times = df.index[entry_idx]
+    exit_prices = np.where(directions == LONG, bid[exit_idx], ask[exit_idx])
+    trades = ['win' if is_win else 'lose' for is_win in wins]
+    trade_details = [
+        {
+            'entry_time': entry_time,
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'direction': _direction_name(direction),
+            'outcome': outcome
+        }
+        for entry_time, entry_price, exit_price, direction, outcome
+        in zip(entry_times, entry_prices, exit_prices, directions, trades)
+    ]
+    return trades, trade_details
+
+
+def iter_csv_ticks(csv_path, chunk_rows=1_000_000):
+    """
+    Reads a downloaded tick CSV (timestamp in ms, askPrice, bidPrice) chunk by chunk.
+
+    :return: Generator of (timestamp, bid, ask) array tuples of at most chunk_rows ticks.
+    """
+    reader = pd.read_csv(
+        csv_path,
+        usecols=['timestamp', 'bidPrice', 'askPrice'],
+        dtype={'timestamp': 'int64', 'bidPrice': 'float64', 'askPrice': 'float64'},
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        yield chunk['timestamp'].to_numpy(), chunk['bidPrice'].to_numpy(), chunk['askPrice'].to_numpy()
+
+
+def stream_trades(chunks, sl_pip, rr_ratio=RR_RATIO, start_direction='short', pip=PIP):
+    """
+    Constant memory version of simulate_trades over a chunked tick source.
+
+    The open position is carried across chunk boundaries, so the trades are
+    the same as simulate_trades on the concatenated ticks.
+
+    :param chunks: Iterable of (timestamp, bid, ask) arrays, timestamp in ms since epoch,
+        e.g. iter_csv_ticks or tick_store.iter_ticks
+    :param sl_pip: Stop loss in pips
+    :param rr_ratio: Take profit as a multiple of the stop loss
+    :param start_direction: 'long' or 'short' for the first position
+    :param pip: Price size of one pip
+    :return: Generator of trade_details dicts in the order the trades close.
+    """
+    state = new_position_state(sl_pip, pip=pip, start_direction=start_direction, rr_ratio=rr_ratio)
+    for timestamps, bid, ask in chunks:
+        bid = np.asarray(bid, dtype=np.float64)
+        ask = np.asarray(ask, dtype=np.float64)
+        for _, _, entry_time, entry_price, exit_price, direction, is_win in scan_ticks(bid, ask, state, timestamps):
+            yield {
+                'entry_time': pd.Timestamp(int(entry_time), unit='ms'),
+                'entry_price': entry_price,
+                'exit_price': exit_price,
+                'direction': _direction_name(direction),
+                'outcome': 'win' if is_win else 'lose'
+            }
+
+
+def simulate_trades_iterrows(df, sl_pip, start_direction='short'):
+    """
+    Original row by row implementation, kept as the reference for parity checks.
+
+    :param start_direction: Direction of the first position, the original always started short
+    """
+    trades = []  # Store trade outcomes ('win' or 'lose')
+    trade_details = []  # Detailed info about each trade
+    in_position = False
+    entry_price = None
+    current_direction = start_direction
+    is_first_position = True
+    STOP_LOSS = sl_pip * PIP
+    TAKE_PROFIT = sl_pip * 3 * PIP
+
+    for index, row in df.iterrows():
+        # Check trading time
+        # if LONDON_OPEN <= index.time() <= LONDON_CLOSE:
+        if is_first_position == True:
+            # Randomly decide to open a long or short position if not already in one
+            entry_price = row['askPrice'] if current_direction == 'long' else row['bidPrice']
+            in_position = True
+            entry_time = index
+            is_first_position = False
+        elif in_position and not is_first_position :
+            # Check for stop loss and take profit conditions
+            if current_direction == 'long':
+                if row['bidPrice'] >= entry_price + TAKE_PROFIT or row['bidPrice'] <= entry_price - STOP_LOSS:
+                    in_position = False
+            else:  # current_direction == 'short'
+                if row['askPrice'] <= entry_price - TAKE_PROFIT or row['askPrice'] >= entry_price + STOP_LOSS:
+                    in_position = False
+        elif not in_position and not is_first_position:
+            # Determine trade outcome
+            outcome = 'win' if (
+                (current_direction == 'long' and row['bidPrice'] >= entry_price) or
+                (current_direction == 'short' and row['askPrice'] <= entry_price)
+            ) else 'lose'
+            trades.append(outcome)
+
+            # Record trade details
+            trade_details.append({
+                'entry_time': entry_time,
+                'entry_price': entry_price,
+                'exit_price': row['bidPrice'] if current_direction == 'long' else row['askPrice'],
+                'direction': current_direction,
+                'outcome': outcome
+            })
+            entry_price = row['askPrice'] if current_direction == 'long' else row['bidPrice']
+            in_position = True
+            entry_time = index
+
+            # Flip direction on loss
+            if outcome == 'lose':
+                current_direction = 'long' if current_direction == 'short' else 'short'
+
+    return trades, trade_details
+
+
+def _count_performance(wins, losses, outcome_count):
+    total_trades = wins + losses
+    win_ratio = wins / total_trades if total_trades > 0 else 0
+
+    # Assuming risk-free rate is 0 for simplicity. Adjust as needed.
+    # The +1/-1 returns of the outcome_count outcomes have mean m = (wins - non-wins) / n and
+    # standard deviation sqrt(1 - m^2), so the Sharpe ratio needs no array of returns.
+    mean_return = (2 * wins - outcome_count) / outcome_count if outcome_count > 0 else 0
+    std_return = np.sqrt(max(1 - mean_return ** 2, 0))
+    sharpe_ratio = mean_return / std_return if std_return != 0 else 0
+
+    return win_ratio, sharpe_ratio, wins, losses
+
+
+def outcome_performance(is_win):
+    """
+    evaluate_performance of a boolean win array, without building a list of strings.
+    """
+    is_win = np.asarray(is_win, dtype=bool)
+    wins = int(np.count_nonzero(is_win))
+    return _count_performance(wins, len(is_win) - wins, len(is_win))
+
+
+def evaluate_performance(trades):
+    """
+    Win ratio, +/-1 Sharpe ratio, wins and losses of a list of 'win'/'lose' outcomes.
+    """
+    return _count_performance(trades.count('win'), trades.count('lose'), len(trades))
@@ -0,0 +1,297 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import time
+
+from .rate_provider import prefetch_rates, sizing_legs
+from .forex_calculators import forex_trade_calculator
+from .mt5_dao import prepare_order, send_order
+from .position_watcher import PositionWatcher
+from .deal_ledger import DealLedger
+from .performance_analytics import PerformanceTracker
+from . import latency_metrics
+from .latency_metrics import timed
+
+
+logger = logging.getLogger(__name__)
+
+# The MetaTrader5 module and the deal ledger on it, set up by main so importing the bot
+# (replay, benchmarks, the CLI) needs neither the terminal package nor the ledger file
+mt5 = None
+deal_ledger = None
+
+
+def configure_logging(log_dir=None):
+    """
+    Logs everything to trading_bot_<date>.log and the console; called by main, not on import.
+
+    :param log_dir: Directory of the log file, BOOKOO_LOG_DIR or the working directory by default
+    """
+    log_dir = log_dir or os.environ.get("BOOKOO_LOG_DIR", os.getcwd())
+    current_date = datetime.datetime.now().strftime("%Y-%m-%d")
+    logging.basicConfig(level=logging.DEBUG,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[
+                            logging.FileHandler(os.path.join(log_dir, f"trading_bot_{current_date}.log")),
+                            logging.StreamHandler()
+                        ])
+
+
+def state_dir(directory=None):
+    """
+    Directory of the bot's deal_ledger.json and latency_metrics.json, created if missing.
+
+    :param directory: BOOKOO_STATE_DIR or the working directory by default, never the installed package
+    """
+    directory = directory or os.environ.get("BOOKOO_STATE_DIR", os.getcwd())
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+@timed("prepare_entry")
+def prepare_entry(symbol_input, stop_loss_pips_input, is_buy_input, account_balance_input=None):
+    """
+    Sizes an entry from the account balance and builds its order template, so entering only prices and sends it.
+
+    :param account_balance_input: Balance to size with, the terminal's current balance by default
+    :return: Order template for mt5_dao.send_order.
+    :raises ValueError: If the lot size is outside the symbol's volume limits or no conversion rate is known.
+    """
+
+    ######## START TRADE INPUTS ########
+
+    is_stop_limit = False
+    stop_limit_price = 1.08726
+
+    ######## END TRADE INPUTS ########
+
+
+    if account_balance_input is None:
+        account_balance_input = mt5.account_info().balance
+    base_currency_input = "EUR"
+    risk_percent_input = 1
+    leverage_input = 5
+
+    calculated_info = forex_trade_calculator(symbol=symbol_input, leverage=leverage_input, base_currency=base_currency_input, account_balance=account_balance_input, risk_percent=risk_percent_input, stop_loss_pips=stop_loss_pips_input)
+    if calculated_info is None:
+        raise ValueError(f"No conversion rate to size {symbol_input}")
+    lot_size = None
+    if calculated_info['risk_respecting_lot_size'] >  calculated_info['maximum_lot_size']: 
+        lot_size = calculated_info['maximum_lot_size']
+    else: 
+        lot_size = calculated_info['risk_respecting_lot_size']
+    if is_stop_limit: 
+        return prepare_order(lot_size - 0.01, symbol_input, is_buy_input, stop_loss_pips_input, stop_limit_price)
+    return prepare_order(lot_size, symbol_input, is_buy_input, stop_loss_pips_input)
+
+
+def enter_position(symbol_input, stop_loss_pips_input, is_buy_input, exclusive=True, template=None):
+    """
+    Sends the entry, sizing it first unless a template prepared with prepare_entry is given.
+    """
+    mt5.initialize()
+    account = mt5.account_info()
+
+    # An exclusive entry needs a flat account, other symbols' positions don't block a shared runner
+    if not exclusive or account.margin_free == account.balance: 
+        try:
+            if template is None:
+                template = prepare_entry(symbol_input, stop_loss_pips_input, is_buy_input, account.balance)
+        except ValueError as error:
+            logger.error(f"Not entering {symbol_input}: {error}")
+            return
+        send_order(template)
+    else: 
+        logger.error("There is already a position")
+
+def is_current_position_exist(symbol): 
+    positions = mt5.positions_get(symbol=symbol)
+    return len(positions) > 0
+
+@timed("get_last_position")
+def get_last_position(symbol): 
+    if not mt5.initialize():
+        logger.error("initialize() failed")
+
+    if deal_ledger.sync() is None:
+        logger.error("No deals found")
+        return None
+
+    # Check if we found any deals and print the most recent
+    last_deal = deal_ledger.last_deal(symbol)
+    if last_deal:
+        logger.info(f"Last deal for {symbol}: ticket={last_deal.ticket}, type={last_deal.type}, volume={last_deal.volume}, price={last_deal.price}, profit={last_deal.profit}")
+        return last_deal
+    else:
+        logger.error(f"No deals found for {symbol}")
+
+
+
+class BookooStrategy:
+    """
+    State of the flip-on-loss strategy on one symbol, so several symbols can share one process.
+
+    :param symbol: Symbol traded, e.g. EURUSD
+    :param stop_loss_pips: Stop loss in pips
+    :param start_direction: LONG or SHORT for the first position
+    :param exclusive: Only enter when the whole account is flat, as the single symbol bot always did
+    :param clock: UTC wall clock in seconds, timing the entries for the session P&L; replaced by the
+        terminal's virtual clock in replays
+    """
+
+    def __init__(self, symbol, stop_loss_pips, start_direction="SHORT", exclusive=True, clock=time.time):
+        self.symbol = symbol
+        self.stop_loss_pips = stop_loss_pips
+        self.start_direction = start_direction
+        self.exclusive = exclusive
+        self.is_first_position = True
+        # Order template of the first entry, see prepare_first_entry
+        self.first_entry = None
+        # Profit, win ratio, drawdown, streaks and session P&L of the closed trades, O(1) per trade
+        self.performance = PerformanceTracker()
+        self.clock = clock
+        # UTC ms of the last entry sent, the closing deal's time_msc is broker server time
+        self.entry_time_ms = None
+        # Ticket of the last closing deal counted, a retried re-entry reads the same deal again
+        self.counted_ticket = None
+
+    @property
+    def stat_profit(self):
+        return self.performance.profit
+
+    @property
+    def stat_loss_trades(self):
+        return self.performance.losses
+
+    @property
+    def stat_win_trades(self):
+        return self.performance.wins
+
+    def prepare_first_entry(self):
+        """
+        Sizes the first entry and builds its order, so the start only has to send it.
+        """
+        try:
+            self.first_entry = prepare_entry(self.symbol, self.stop_loss_pips, self.start_direction == "LONG")
+        except ValueError as error:
+            logger.error(f"Not preparing the first {self.symbol} entry: {error}")
+
+    @timed("main")
+    def on_flat(self):
+        """
+        Enters the next position of the symbol, called when it has none open.
+        """
+        if self.is_first_position: # If there is no position and start, create one
+            logger.info("*****************************************************************")
+            logger.info("*****************************************************************")
+            logger.info("*****************************************************************")
+            logger.info(f"*****************   STRATEGY START {self.symbol}   *********************")
+            logger.info("*****************************************************************")
+            logger.info("*****************************************************************")
+            logger.info("*****************************************************************")
+
+            is_buy_input = False
+            if self.start_direction == "LONG": 
+                is_buy_input = True
+            logger.info(f'Creating first position for {self.symbol}')
+            self.entry_time_ms = int(self.clock() * 1000)
+            enter_position(self.symbol, self.stop_loss_pips, is_buy_input, self.exclusive, self.first_entry)
+            self.first_entry = None
+            self.is_first_position = False
+            return
+
+        # If there is no position and not start:
+        current_last_position = get_last_position(self.symbol)
+        if current_last_position is None:
+            # Flat without a closing deal yet, the watcher calls again after its backoff
+            return
+        logger.debug(f"Last deal for {self.symbol}: ticket={current_last_position.ticket}, type={current_last_position.type}, volume={current_last_position.volume}, price={current_last_position.price}, profit={current_last_position.profit}")
+        is_buy_input = False
+        if current_last_position.ticket != self.counted_ticket:
+            self.performance.update(current_last_position.profit, self.entry_time_ms)
+            self.counted_ticket = current_last_position.ticket
+        if current_last_position.profit < 0 and current_last_position.type == mt5.ORDER_TYPE_BUY:
+            logger.debug("Last SHORT position was a LOSS therefore switching to LONG")
+            is_buy_input = True
+        elif current_last_position.profit >= 0 and current_last_position.type == mt5.ORDER_TYPE_BUY:
+            logger.debug("Last SHORT position was WIN therefore staying to SHORT")
+            is_buy_input = False
+        elif current_last_position.profit < 0 and current_last_position.type == mt5.ORDER_TYPE_SELL:
+            logger.debug("Last LONG position was LOSS therefore switching to SHORT")
+            is_buy_input = False
+        elif current_last_position.profit >= 0 and current_last_position.type == mt5.ORDER_TYPE_SELL:
+            logger.debug("Last LONG position was WIN therefore staying to LONG")
+            is_buy_input = True
+
+        self.entry_time_ms = int(self.clock() * 1000)
+        enter_position(self.symbol, self.stop_loss_pips, is_buy_input, self.exclusive)
+        # Written once the order is out, not while syncing before it
+        deal_ledger.save()
+        self.log_statistics()
+
+    def log_statistics(self):
+        # Nothing to format when debug logging is off
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        performance = self.performance
+        logger.debug(f"***************** START Current statistics {self.symbol} *****************")
+        logger.debug(f"Profit: {performance.profit}")
+        logger.debug(f"Lost trades: {performance.losses}")
+        logger.debug(f"Win trades: {performance.wins}")
+        if performance.trades > 0:
+            logger.debug(f"Win Ratio: {round(performance.win_ratio * 100, 2)}%")
+            logger.debug(f"Max drawdown: {performance.max_drawdown:.2f}")
+            logger.debug(f"Longest win/loss streak: {performance.longest_win_streak}/{performance.longest_loss_streak}")
+            logger.debug(f"Session profit: {performance.session_profit}")
+        else:
+            logger.debug("Win Ratio: No trades completed")
+        logger.debug(f"***************** END Current statistics {self.symbol} *****************")
+
+
+startDirection = "SHORT" # LONG/SHORT
+# Every symbol runs its own strategy in this process over the one MT5 session,
+# e.g. ["EURUSD", "GBPUSD", "USDJPY", "USDCAD", "USDCHF", "AUDUSD", "GBPJPY", "AUDJPY", "NZDUSD"]
+bot_symbols = ["EURUSD"]
+stop_loss_pips_input = 0.1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Bookoo strategy live on the MetaTrader 5 terminal")
+    parser.add_argument("--symbols", nargs="+", default=bot_symbols)
+    parser.add_argument("--sl-pips", type=float, default=stop_loss_pips_input, help="Stop loss in pips")
+    parser.add_argument("--direction", default=startDirection, choices=["LONG", "SHORT"], help="Direction of the first entry")
+    parser.add_argument("--log-dir", help="Directory of the log file, BOOKOO_LOG_DIR or the working directory by default")
+    parser.add_argument("--state-dir", help="Directory of deal_ledger.json and latency_metrics.json, "
+                                            "BOOKOO_STATE_DIR or the working directory by default")
+    args = parser.parse_args(argv)
+
+    configure_logging(args.log_dir)
+    directory = state_dir(args.state_dir)
+    global mt5, deal_ledger
+    import MetaTrader5 as mt5
+    mt5.initialize()
+    # Deals are fetched incrementally from the last seen one, the cursor survives restarts
+    deal_ledger = DealLedger(mt5, path=os.path.join(directory, "deal_ledger.json"))
+
+    # A single symbol keeps the old flat account check, several symbols share the account
+    exclusive = len(args.symbols) == 1
+    strategies = [BookooStrategy(symbol, args.sl_pips, args.direction, exclusive) for symbol in args.symbols]
+
+    # Warm the conversion rates so sizing an entry never waits on the network
+    prefetch_rates(sizing_legs(args.symbols))
+    # Later entries are sized when the previous position closes, their direction depends on its result
+    for strategy in strategies:
+        strategy.prepare_first_entry()
+
+    # Per-stage latency histograms (p50/p99/max) of the entry path, rewritten every minute
+    latency_metrics.start_periodic_dump(os.path.join(directory, "latency_metrics.json"))
+
+    # Re-enter as soon as a position closes instead of polling every 10 seconds
+    watcher = PositionWatcher(mt5, {strategy.symbol: strategy.on_flat for strategy in strategies})
+    asyncio.run(watcher.run())
+
+
+if __name__ == "__main__":
+    main()
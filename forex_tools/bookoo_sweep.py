@@ -0,0 +1,158 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .bookoo_backtest_engine import new_position_state, outcome_performance, scan_ticks, PIP
+from . import session_calendar
+from .position_sizing import symbol_metadata
+from .session_calendar import SessionCalendar
+from .tick_store import load_calendar, load_ticks, ticks_to_dataframe
+
+# Session name -> (open, close) UTC time of day, None means every tick is traded;
+# the named sessions only trade on trading days, see session_calendar
+SESSIONS = {
+    "all": None,
+    **session_calendar.SESSIONS,
+}
+
+# Filled in by _init_worker with numpy views over the parent's shared memory
+_worker_arrays = {}
+_worker_session_ranges = {}
+_worker_shm = []
+
+
+def build_grid(sl_pips, rr_ratios=(3,), start_directions=("short",), sessions=("all",)):
+    """
+    Cartesian product of the sweep parameters as a list of dicts.
+    """
+    return [
+        {"sl_pip": sl_pip, "rr_ratio": rr_ratio, "start_direction": start_direction, "session": session}
+        for sl_pip, rr_ratio, start_direction, session
+        in itertools.product(sl_pips, rr_ratios, start_directions, sessions)
+    ]
+
+
+def _share_array(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _init_worker(specs, session_ranges):
+    _worker_session_ranges.update(session_ranges)
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_shm.append(shm)
+        _worker_arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _session_chunks(session):
+    bid, ask = _worker_arrays["bid"], _worker_arrays["ask"]
+    if SESSIONS[session] is None:
+        return [(bid, ask)]
+    # Row ranges from the calendar, one per trading day, so no timestamp is looked at;
+    # the slices are views of the shared memory, nothing is copied
+    return [(bid[start:end], ask[start:end]) for start, end in zip(*_worker_session_ranges[session])]
+
+
+def _run_point(params):
+    state = new_position_state(params["sl_pip"], pip=params["pip"], start_direction=params["start_direction"],
+                               rr_ratio=params["rr_ratio"])
+    # The open position carries over from one day's session to the next, as on the concatenated session ticks
+    is_win = np.array([trade[6] for bid, ask in _session_chunks(params["session"]) for trade in scan_ticks(bid, ask, state)],
+                      dtype=bool)
+    win_ratio, sharpe_ratio, wins, losses = outcome_performance(is_win)
+    return {
+        "sl_pip": params["sl_pip"],
+        "rr_ratio": params["rr_ratio"],
+        "start_direction": params["start_direction"],
+        "session": params["session"],
+        "win_ratio": win_ratio,
+        "sharpe_ratio": sharpe_ratio,
+        "wins": wins,
+        "losses": losses,
+    }
+
+
+def run_sweep(df, grid, processes=None, pip=PIP, calendar=None):
+    """
+    Runs every grid point over a process pool and collects the outcome_performance results.
+
+    The tick arrays are copied once into shared memory; workers map them
+    instead of receiving a pickled DataFrame per task. Sessions reach the
+    workers as the calendar's per-day row ranges, a few integers per day.
+
+    :param df: Tick DataFrame indexed by timestamp with bidPrice and askPrice columns
+    :param grid: List of parameter dicts, see build_grid
+    :param processes: Number of worker processes, defaults to the CPU count
+    :param pip: Price size of one pip
+    :param calendar: SessionCalendar of df's ticks, e.g. tick_store.load_calendar; built once here if None
+    :return: DataFrame with one row per grid point.
+    :raises ValueError: When the calendar was built from other ticks than df's
+    """
+    if calendar is not None and calendar.rows != len(df):
+        raise ValueError(f"The calendar indexes {calendar.rows} ticks but df has {len(df)}, build it from the same ticks")
+    sessions = {params["session"] for params in grid if SESSIONS[params["session"]] is not None}
+    session_ranges = {}
+    if sessions:
+        calendar = calendar or SessionCalendar.build(df.index.values.astype('datetime64[ms]').astype(np.int64))
+        session_ranges = {session: calendar.ranges(session) for session in sessions}
+
+    arrays = {
+        "bid": df['bidPrice'].to_numpy(dtype=np.float64),
+        "ask": df['askPrice'].to_numpy(dtype=np.float64),
+    }
+    blocks = []
+    specs = {}
+    try:
+        for key, array in arrays.items():
+            shm, spec = _share_array(array)
+            blocks.append(shm)
+            specs[key] = spec
+        del arrays
+
+        tasks = [dict(params, pip=pip) for params in grid]
+        processes = processes or os.cpu_count()
+        # A few chunks per worker amortize the task pickling and still balance the load
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(specs, session_ranges)) as pool:
+            rows = list(pool.map(_run_point, tasks, chunksize=chunksize))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the Bookoo strategy parameters over the stored ticks of a symbol")
+    parser.add_argument("root", help="Tick store directory, see tick_store.py")
+    parser.add_argument("symbol")
+    parser.add_argument("--start", help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last day, YYYY-MM-DD")
+    parser.add_argument("--sl-pips", type=float, nargs="+", default=list(range(1, 21)))
+    parser.add_argument("--rr-ratios", type=float, nargs="+", default=[3])
+    parser.add_argument("--directions", nargs="+", default=["short"], choices=["short", "long"])
+    parser.add_argument("--sessions", nargs="+", default=["all"], choices=list(SESSIONS))
+    parser.add_argument("--processes", type=int, help="Worker processes, the CPU count by default")
+    parser.add_argument("--top", type=int, default=20, help="Rows printed, best Sharpe ratio first")
+    parser.add_argument("--csv", help="Write all results to this CSV")
+    args = parser.parse_args(argv)
+
+    df = ticks_to_dataframe(load_ticks(args.root, args.symbol, args.start, args.end))
+    calendar = load_calendar(args.root, args.symbol, args.start, args.end)
+    grid = build_grid(args.sl_pips, args.rr_ratios, args.directions, args.sessions)
+    results = run_sweep(df, grid, args.processes, symbol_metadata(args.symbol)["pip_size"], calendar)
+    print(results.sort_values("sharpe_ratio", ascending=False).head(args.top).to_string(index=False))
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import importlib
+import sys
+
+# Command -> (module, function, help). A module is only imported when its command runs, so sizing a
+# trade never loads pandas, the backtest or MetaTrader5, and only the bot connects to the terminal.
+COMMANDS = {
+    "size": ("cli", "size_main", "Lot size of one trade from the balance, risk and stop loss"),
+    "backtest": ("portfolio_backtest", "main", "Backtest stored symbols with one shared account"),
+    "sweep": ("bookoo_sweep", "main", "Sweep the strategy parameters over the stored ticks of a symbol"),
+    "bot": ("bookoo_strat_bot", "main", "Run the Bookoo strategy live on the MetaTrader 5 terminal"),
+}
+
+
+def size_main(argv=None):
+    parser = argparse.ArgumentParser(prog="forex-tools size", description=COMMANDS["size"][2])
+    parser.add_argument("symbol", help="Currency pair, e.g. USDJPY")
+    parser.add_argument("--balance", type=float, required=True, help="Account balance in EUR")
+    parser.add_argument("--sl-pips", type=float, required=True, help="Stop loss in pips")
+    parser.add_argument("--risk", type=float, default=1.0, help="Percentage of the balance risked")
+    parser.add_argument("--leverage", type=float, help="Caps the lot size at what the balance allows with this leverage")
+    parser.add_argument("--rate", action="append", default=[], metavar="LEG=RATE",
+                        help="Fixed conversion rate, e.g. EURJPY=X=162.3; legs not given are fetched")
+    args = parser.parse_args(argv)
+
+    rates = {}
+    for argument in args.rate:
+        leg, _, rate = argument.rpartition("=")
+        rates[leg] = float(rate)
+
+    from .position_sizing import batch_lot_sizes, build_symbol_table
+    sizes = batch_lot_sizes([args.symbol], args.balance, args.risk, args.sl_pips, args.leverage, rates,
+                            table=build_symbol_table([args.symbol]))
+    print(f"Lot size: {sizes['lot_size'][0]:.2f}")
+    if args.leverage is not None:
+        print(f"Maximum lot size: {sizes['max_lot_size'][0]:.2f}")
+        print(f"Capped lot size: {sizes['capped_lot_size'][0]:.2f}")
+    print(f"Change per pip: €{sizes['change_per_pip'][0]:.2f}")
+    print(f"Money at risk: €{sizes['money_at_risk'][0]:.2f}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        parser = argparse.ArgumentParser(
+            prog="forex-tools", description="Forex trading tools",
+            epilog="\n".join(f"  {command:10} {help_text}" for command, (_, _, help_text) in COMMANDS.items()),
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+        parser.add_argument("command", choices=list(COMMANDS), help="Run forex-tools <command> --help for its options")
+        parser.parse_args(argv[:1])
+    module, function, _ = COMMANDS[argv[0]]
+    return getattr(importlib.import_module(f".{module}", __package__), function)(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import datetime
+import json
+import logging
+import os
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+LOOKBACK_DAYS = 2  # History fetched on the very first sync, as get_last_position always did
+
+# The fields of MT5's TradeDeal the bot reads, so deals restored from disk look the same
+LedgerDeal = namedtuple("LedgerDeal", ["ticket", "time", "time_msc", "type", "entry", "volume", "price", "profit", "symbol"])
+
+
+def _to_ledger_deal(deal):
+    return LedgerDeal(**{field: getattr(deal, field) for field in LedgerDeal._fields})
+
+
+class DealLedger:
+    """
+    In-memory index of the account's deals, filled incrementally from MT5.
+
+    Every sync only asks the terminal for deals from the last seen deal's time
+    on, and keeps per-symbol aggregates so the last deal and the running P&L
+    of a symbol are dictionary lookups. With a path save() writes the cursor and
+    aggregates, which are restored on the next start. sync() doesn't write, so
+    the file stays off the path from a close to the next order: the bot saves
+    once the re-entry is sent. Deals not saved before a restart are fetched
+    again from the saved cursor.
+
+    :param mt5: MetaTrader5 module, or any object with history_deals_get
+    :param path: JSON file to persist the ledger to, None keeps it in memory only
+    :param now: Function returning the current datetime, replaced by a virtual clock in replays
+    """
+
+    def __init__(self, mt5, path=None, lookback_days=LOOKBACK_DAYS, now=datetime.datetime.now):
+        self.mt5 = mt5
+        self.path = path
+        self.lookback_days = lookback_days
+        self.now = now
+        self.cursor_time = None  # Server time (seconds) of the newest deal seen
+        self.cursor_ticket = 0  # Highest deal ticket seen, tickets only grow
+        self.symbols = {}  # symbol -> {"last_deal": LedgerDeal, "profit": float, "deals": int}
+        self.unsaved = False  # Deals were added since the last save
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.cursor_time = saved["cursor_time"]
+        self.cursor_ticket = saved["cursor_ticket"]
+        self.symbols = {
+            symbol: {"last_deal": LedgerDeal(**stats["last_deal"]), "profit": stats["profit"], "deals": stats["deals"]}
+            for symbol, stats in saved["symbols"].items()
+        }
+
+    def save(self):
+        """
+        Writes the cursor and aggregates to path, if any deal was added since the last save.
+        """
+        if self.path is None or not self.unsaved:
+            return
+        saved = {
+            "cursor_time": self.cursor_time,
+            "cursor_ticket": self.cursor_ticket,
+            "symbols": {
+                symbol: {"last_deal": stats["last_deal"]._asdict(), "profit": stats["profit"], "deals": stats["deals"]}
+                for symbol, stats in self.symbols.items()
+            },
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.path)
+        self.unsaved = False
+
+    def sync(self):
+        """
+        Fetches the deals made since the cursor and folds them into the per-symbol aggregates.
+
+        :return: Number of new deals, or None if the terminal returned no history.
+        """
+        if self.cursor_time is None:
+            from_date = self.now() - datetime.timedelta(days=self.lookback_days)
+        else:
+            # Same clock as deal.time, no timezone conversion between the cursor and the server
+            from_date = self.cursor_time
+        to_date = self.now() + datetime.timedelta(days=1)  # Includes today by adding a day
+
+        deals = self.mt5.history_deals_get(from_date, to_date)
+        if deals is None:
+            return None
+
+        new_deals = sorted((deal for deal in deals if deal.ticket > self.cursor_ticket), key=lambda deal: (deal.time_msc, deal.ticket))
+        for deal in new_deals:
+            stats = self.symbols.setdefault(deal.symbol, {"last_deal": None, "profit": 0.0, "deals": 0})
+            stats["last_deal"] = _to_ledger_deal(deal)
+            stats["profit"] += deal.profit
+            stats["deals"] += 1
+            self.cursor_ticket = max(self.cursor_ticket, deal.ticket)
+            self.cursor_time = max(self.cursor_time or 0, deal.time)
+        if new_deals:
+            self.unsaved = True
+        return len(new_deals)
+
+    def last_deal(self, symbol):
+        stats = self.symbols.get(symbol)
+        return None if stats is None else stats["last_deal"]
+
+    def profit(self, symbol):
+        stats = self.symbols.get(symbol)
+        return 0.0 if stats is None else stats["profit"]
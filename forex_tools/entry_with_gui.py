@@ -0,0 +1,177 @@
+import logging
+import time
+import tkinter as tk
+from tkinter import ttk
+
+import MetaTrader5 as mt5
+from .mt5_dao import get_symbol_info, prepare_order, send_order
+from .forex_calculators import calculate_lot_size
+from .rate_provider import get_current_price, prefetch_rates, rate_pair_map
+from .gui_handlers import display_results
+from .execution_worker import ExecutionWorker
+
+RESPONSE_POLL_MS = 50
+
+# (symbol, stop loss pips, is_buy) -> (balance, lot size, pip value, money at risk, order template) prepared
+# before the click, only touched on the worker thread
+prepared_orders = {}
+
+
+def enter_main(symbol_input, stop_loss_pips_input, is_buy_input, clicked_at=None, on_status=None):
+
+    ######## START TRADE INPUTS ########
+
+    is_stop_limit = False
+    stop_limit_price = 1
+
+    ######## END TRADE INPUTS ########
+
+
+    if on_status is not None:
+        on_status(f"Status: sizing {symbol_input}...")
+    account = mt5.account_info()
+    account_balance_input = account.balance
+
+    # An order prepared for this pair, stop loss and balance only needs its price
+    prepared = prepared_orders.get((symbol_input, stop_loss_pips_input, is_buy_input))
+    if is_stop_limit:
+        lot_size, pip_value, money_at_risk = size_entry(symbol_input, stop_loss_pips_input, account_balance_input)
+        template = prepare_order(lot_size - 0.01, symbol_input, is_buy_input, stop_loss_pips_input, stop_limit_price)
+    elif prepared is not None and prepared[0] == account_balance_input:
+        _, lot_size, pip_value, money_at_risk, template = prepared
+    else:
+        lot_size, pip_value, money_at_risk = size_entry(symbol_input, stop_loss_pips_input, account_balance_input)
+        template = prepare_order(lot_size, symbol_input, is_buy_input, stop_loss_pips_input)
+ 
+    if on_status is not None:
+        on_status(f"Status: sending {symbol_input} order, lot size {lot_size}...")
+    order_send_result = send_order(template, clicked_at)
+
+    if clicked_at is not None:
+        print(f"Click to order latency for {symbol_input}: {(time.perf_counter() - clicked_at) * 1000:.1f} ms")
+
+    position_info = {
+        "risk_respecting_lot_size": lot_size,
+        "pip_value": pip_value,
+        "money_at_risk": money_at_risk,
+        "comment": order_send_result.comment
+    }
+    
+    return position_info
+
+
+
+
+def size_entry(symbol_input, stop_loss_pips_input, account_balance_input):
+    risk_percent_input = 1
+    return calculate_lot_size(account_balance=account_balance_input, risk_percentage=risk_percent_input, stop_loss_pips=stop_loss_pips_input, symbol=symbol_input)
+
+
+def warm_pair(symbol, stop_loss_pips_input=None):
+    """
+    Loads the conversion rate and symbol info of a pair so its first order doesn't wait on them, and
+    with a stop loss prepares its buy and sell orders so a click only prices and sends one.
+    """
+    if symbol in rate_pair_map:
+        get_current_price(rate_pair_map[symbol])
+    get_symbol_info(symbol)
+    if stop_loss_pips_input is None:
+        return
+    account_balance_input = mt5.account_info().balance
+    lot_size, pip_value, money_at_risk = size_entry(symbol, stop_loss_pips_input, account_balance_input)
+    for is_buy in (True, False):
+        prepared_orders[(symbol, stop_loss_pips_input, is_buy)] = (
+            account_balance_input, lot_size, pip_value, money_at_risk,
+            prepare_order(lot_size, symbol, is_buy, stop_loss_pips_input))
+
+
+def set_status(text):
+    status_message_var.set(text)
+
+
+def submit_entry(is_buy):
+    clicked_at = time.perf_counter()
+    symbol = pair_var.get()
+    stop_loss_pips_input = float(stop_loss_pips_entry.get())
+    side = "Buy" if is_buy else "Sell"
+    set_status(f"Status: {side} {symbol} queued...")
+    print(f"{side} order for {symbol} with stop loss at {stop_loss_pips_input} pips")
+    worker.submit(enter_main, symbol, stop_loss_pips_input, is_buy, clicked_at, lambda text: worker.post(set_status, text),
+                  on_done=lambda position_info: set_status(display_results(position_info)),
+                  on_error=lambda error: set_status(f"Order execution status: Failed\n{error}"))
+
+
+def on_buy():
+    submit_entry(True)
+
+def on_sell():
+    submit_entry(False)
+
+def on_pair_selected(event=None):
+    # Called again when the stop loss is entered, the orders are prepared once both are known
+    try:
+        stop_loss_pips_input = float(stop_loss_pips_entry.get())
+    except ValueError:
+        stop_loss_pips_input = None
+    if pair_var.get():
+        worker.submit(warm_pair, pair_var.get(), stop_loss_pips_input)
+
+def poll_responses():
+    worker.process_responses()
+    root.after(RESPONSE_POLL_MS, poll_responses)
+
+# mt5_dao reports every order and its result on its logger, show them on the console
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Orders run on a background thread so the window never freezes on a click
+worker = ExecutionWorker()
+worker.submit(mt5.initialize)
+
+# Set up the Tkinter window
+root = tk.Tk()
+root.title("Forex Trade Calculator")
+root.geometry("600x400")  # Make the window bigger
+
+# Styling
+style = ttk.Style()
+style.configure("TLabel", font=("Arial", 12), padding=10)
+style.configure("TButton", font=("Arial", 10), padding=10)
+style.configure("TEntry", padding=5)
+style.configure("TCombobox", padding=5)
+
+# Currency pair selection
+pair_var = tk.StringVar()
+pair_label = ttk.Label(root, text="Select Currency Pair:", style="TLabel")
+pair_label.pack()
+pair_combobox = ttk.Combobox(root, textvariable=pair_var, width=20)
+pair_combobox['values'] = ("EURUSD", "GBPUSD", "EURGPB", "USDJPY", "USDCAD", "USDCHF", "AUDUSD", "GBPJPY", "AUDJPY", "NZDUSD")  
+pair_combobox.pack(pady=5)
+pair_combobox.bind("<<ComboboxSelected>>", on_pair_selected)
+
+# Stop loss pips input
+stop_loss_pips_label = ttk.Label(root, text="Stop Loss Pips:", style="TLabel")
+stop_loss_pips_label.pack()
+stop_loss_pips_entry = ttk.Entry(root, width=25)
+stop_loss_pips_entry.pack(pady=5)
+stop_loss_pips_entry.bind("<FocusOut>", on_pair_selected)
+stop_loss_pips_entry.bind("<Return>", on_pair_selected)
+
+
+# Buy and Sell buttons
+buy_button = tk.Button(root, text="Buy", command=on_buy, bg="green", fg="white", font=("Arial", 12), height=2, width=10)
+buy_button.pack(side=tk.RIGHT, padx=20, pady=10)
+
+sell_button = tk.Button(root, text="Sell", command=on_sell, bg="red", fg="white", font=("Arial", 12), height=2, width=10)
+sell_button.pack(side=tk.LEFT, padx=20, pady=10)
+
+status_message_var = tk.StringVar()  # This variable will hold the message text
+status_message_var.set("Status: Ready")  # Default message
+status_message_label = ttk.Label(root, textvariable=status_message_var, font=("Arial", 10), foreground="blue")
+status_message_label.pack(pady=10)
+
+# Warm every conversion rate in the background so the first click does not wait on the network
+worker.submit(prefetch_rates)
+
+# Start the GUI loop
+root.after(RESPONSE_POLL_MS, poll_responses)
+root.mainloop()
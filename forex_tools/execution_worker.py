@@ -0,0 +1,62 @@
+import queue
+import threading
+import traceback
+
+
+class ExecutionWorker:
+    """
+    Runs blocking jobs (MT5 calls, rate fetches, order sends) on one background thread.
+
+    Jobs are executed in submission order. Their results, and any status a job
+    posts while running, are queued for the GUI thread, which hands them to
+    their callbacks from process_responses (e.g. from a Tk after() loop), so
+    callbacks can safely touch widgets.
+    """
+
+    def __init__(self):
+        self.requests = queue.Queue()
+        self.responses = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.requests.get()
+            if job is None:
+                return
+            func, args, on_done, on_error = job
+            try:
+                result = func(*args)
+            except Exception as error:
+                traceback.print_exc()
+                if on_error is not None:
+                    self.responses.put((on_error, error))
+                continue
+            if on_done is not None:
+                self.responses.put((on_done, result))
+
+    def submit(self, func, *args, on_done=None, on_error=None):
+        """
+        Queues func(*args), on_done(result) or on_error(exception) is called later on the GUI thread.
+        """
+        self.requests.put((func, args, on_done, on_error))
+
+    def post(self, callback, value):
+        """
+        Queues callback(value) for the GUI thread, for status updates from inside a job.
+        """
+        self.responses.put((callback, value))
+
+    def process_responses(self):
+        """
+        Runs the queued callbacks, to be called from the GUI thread.
+        """
+        while True:
+            try:
+                callback, value = self.responses.get_nowait()
+            except queue.Empty:
+                return
+            callback(value)
+
+    def stop(self):
+        self.requests.put(None)
@@ -0,0 +1,70 @@
+import logging
+
+from .latency_metrics import timed
+from .rate_provider import determine_conversion_symbol, get_current_price, rate_pair_map
+from .position_sizing import symbol_metadata
+
+logger = logging.getLogger(__name__)
+
+UNITS_PER_LOT = 100000  # Number of units per 1 standard lot
+PIP_VALUE_PER_LOT = 10  # Value of one pip for a standard lot in USD
+
+def calculate_lot_size(account_balance, risk_percentage, stop_loss_pips, symbol):
+    # Pip size, contract size and conversion leg come from the same table as batch_lot_sizes
+    metadata = symbol_metadata(symbol)
+    pip_size = metadata["pip_size"]
+    contract_size = metadata["contract_size"]
+    eur_conv_price = get_current_price(metadata["conversion_leg"]) if metadata["conversion_leg"] else 1
+    risk_amount = account_balance * (risk_percentage / 100)
+    pip_value = pip_size / eur_conv_price
+    lot_size = risk_amount / (stop_loss_pips * pip_value * contract_size)
+    money_at_risk = stop_loss_pips * pip_value * lot_size * contract_size
+    change_per_pip = round(money_at_risk / stop_loss_pips, 2)
+    logger.debug(f"{symbol} lot size: {lot_size:.3f}, change per pip: €{int(change_per_pip)}, money at risk: €{money_at_risk:.2f}")
+    return round(lot_size, 2), change_per_pip, money_at_risk
+
+
+@timed("forex_trade_calculator")
+def forex_trade_calculator(symbol, leverage, base_currency, account_balance, risk_percent, stop_loss_pips, convert=True):
+    """
+    Calculates the forex trading values based on the provided parameters.
+
+    Shared by bookoo_strat_bot and the entry notebooks.
+
+    :param symbol: Name of the currency pair traded
+    :param leverage: The leverage ratio (e.g., 30 for 1:30 leverage)
+    :param base_currency: The base currency of the trader's account
+    :param account_balance: The current balance of the account
+    :param risk_percent: The percentage of the account balance the trader is willing to risk
+    :param stop_loss_pips: The stop loss value in pips
+    :param convert: Fetch the rate of the account currency, False sizes at a rate of 1 as entry_calculator does
+
+    :return: A dictionary with the calculated maximum lot size, risk-respecting lot size, and pip value.
+    """
+    # Determine the correct symbol for fetching the conversion rate
+    conversion_symbol = determine_conversion_symbol(base_currency, symbol)
+    conversion_rate = 1  # Default to 1 if no conversion is needed
+    if conversion_symbol and convert:
+        conversion_rate = get_current_price(conversion_symbol)
+        if conversion_rate is None:
+            logger.error("Error fetching conversion rate.")
+            return None
+
+    # Calculating maximum lot size that can be bought with the current balance and leverage
+    max_lot_size = (account_balance * leverage) / (UNITS_PER_LOT * conversion_rate)
+
+    # Calculating the money at risk
+    money_at_risk = account_balance * (risk_percent / 100)
+
+    # Calculating the lot size that respects the risk tolerance
+    # Formula: (money at risk) / (stop loss in pips * pip value per lot * conversion rate)
+    risk_respecting_lot_size = money_at_risk / (stop_loss_pips * PIP_VALUE_PER_LOT * conversion_rate)
+
+    # Calculating how much money a pip worth based on the risk-respecting lot size
+    pip_value = risk_respecting_lot_size * PIP_VALUE_PER_LOT
+
+    return {
+        "maximum_lot_size": round(max_lot_size, 2),
+        "risk_respecting_lot_size": round(risk_respecting_lot_size, 2),
+        "pip_value": round(pip_value, 2)
+    }
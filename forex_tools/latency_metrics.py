@@ -0,0 +1,154 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# Geometric bucket bounds from 1 µs to ~100 s, every bucket 10% wider than the previous one
+BUCKET_GROWTH = 1.1
+BUCKET_BOUNDS = [1e-6 * BUCKET_GROWTH ** i for i in range(194)]
+
+_enabled = os.environ.get("LATENCY_METRICS", "1") != "0"
+_histograms = {}
+_lock = threading.Lock()
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram, percentiles are accurate to one bucket (10%).
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                upper = BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+def set_enabled(enabled):
+    """
+    Turns recording on or off, while off timed functions skip the clock entirely.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def record(stage, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = LatencyHistogram()
+        histogram.record(seconds)
+
+
+def timed(stage):
+    """
+    Decorator timing every call of a function into the stage's histogram.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """
+    p50/p99/max summary of every stage recorded so far.
+    """
+    with _lock:
+        return {stage: histogram.summary() for stage, histogram in _histograms.items()}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def dump(path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"time": time.time(), "stages": snapshot()}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def start_periodic_dump(path, interval=60):
+    """
+    Writes the snapshot to a JSON file every interval seconds from a daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            dump(path)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def serve(port=8765, host="127.0.0.1"):
+    """
+    Serves the snapshot as JSON on http://host:port/ from a daemon thread.
+    """
+    # Imported here, http.server would double the import time of every module timing itself
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class SnapshotHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(snapshot(), indent=1).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer((host, port), SnapshotHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
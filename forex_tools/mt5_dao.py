@@ -0,0 +1,181 @@
+# mt5_dao.py
+import logging
+import time
+from collections import deque
+
+from .latency_metrics import record, timed
+
+logger = logging.getLogger(__name__)
+
+# MetaTrader5, imported on first use so importing mt5_dao needs no terminal package; replay and
+# benchmarks put their own terminal here
+mt5 = None
+
+# symbol -> dict of the symbol_info fields needed to build orders, see get_symbol_info
+_symbol_info_cache = {}
+
+# Most recent order timings, see send_order
+order_timings = deque(maxlen=1000)
+
+
+def _terminal():
+    global mt5
+    if mt5 is None:
+        import MetaTrader5
+        mt5 = MetaTrader5
+    return mt5
+
+
+def get_symbol_info(symbol):
+    """
+    Returns the cached order metadata of a symbol, asking the terminal only on the first call.
+
+    :return: Dictionary with point, digits, volume_min, volume_max, volume_step and filling_mode.
+    """
+    info = _symbol_info_cache.get(symbol)
+    if info is None:
+        symbol_info = _terminal().symbol_info(symbol)
+        if symbol_info is None:
+            raise ValueError(f"Unknown symbol {symbol}")
+        info = {
+            "point": symbol_info.point,
+            "digits": symbol_info.digits,
+            "volume_min": symbol_info.volume_min,
+            "volume_max": symbol_info.volume_max,
+            "volume_step": symbol_info.volume_step,
+            "filling_mode": symbol_info.filling_mode,
+        }
+        _symbol_info_cache[symbol] = info
+    return info
+
+
+def invalidate_symbol_info(symbol=None):
+    """
+    Drops the cached metadata of a symbol, or of every symbol, e.g. after the broker changed its specification.
+    """
+    if symbol is None:
+        _symbol_info_cache.clear()
+    else:
+        _symbol_info_cache.pop(symbol, None)
+
+
+def _filling_type(filling_mode):
+    mt5 = _terminal()
+    # IOC as before when the symbol allows it, otherwise the next policy it supports. Builds of the
+    # package without the SYMBOL_FILLING_* flags (their values are 1 and 2) keep sending IOC.
+    if filling_mode & getattr(mt5, "SYMBOL_FILLING_IOC", 2):
+        return mt5.ORDER_FILLING_IOC
+    if filling_mode & getattr(mt5, "SYMBOL_FILLING_FOK", 1):
+        return getattr(mt5, "ORDER_FILLING_FOK", mt5.ORDER_FILLING_IOC)
+    return getattr(mt5, "ORDER_FILLING_RETURN", mt5.ORDER_FILLING_IOC)
+
+
+def prepare_order(lot_size, symbol, is_buy: bool, sl_pips, stop_limit_price = None, rr_ratio = 3):
+    """
+    Builds and validates an order template, so sending it only has to fill in price, SL and TP.
+
+    Call it when the order is known, e.g. when the symbol is chosen or the previous
+    position closes, and send_order the template when entering.
+
+    :return: Template dictionary for send_order.
+    :raises ValueError: If the volume is outside the symbol's volume limits.
+    """
+    info = get_symbol_info(symbol)
+    volume_step = info["volume_step"]
+    volume = round(round(lot_size / volume_step) * volume_step, 8)
+    if volume < info["volume_min"] or volume > info["volume_max"]:
+        raise ValueError(f"Lot size {lot_size} of {symbol} is outside {info['volume_min']} - {info['volume_max']}")
+
+    mt5 = _terminal()
+
+    action = mt5.SYMBOL_TRADE_EXECUTION_MARKET
+    if stop_limit_price != None:
+        action = mt5.TRADE_ACTION_PENDING
+
+    type = mt5.ORDER_TYPE_BUY if is_buy else mt5.ORDER_TYPE_SELL
+    if is_buy and stop_limit_price != None:
+        type = mt5.ORDER_TYPE_BUY_STOP_LIMIT
+    if is_buy != True and stop_limit_price != None: 
+        type = mt5.ORDER_TYPE_SELL_STOP_LIMIT
+
+    one_pip = 10 * info["point"]
+    direction = 1 if is_buy else -1
+
+    deviation = 20
+
+    return {
+        "request": {
+            "action": action,
+            "symbol": symbol,
+            "volume": volume,
+            "type": type,
+            "deviation": deviation,
+            "comment": "hronnie python entry",
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": _filling_type(info["filling_mode"]),
+        },
+        "stop_limit_price": stop_limit_price,
+        "digits": info["digits"],
+        "sl_offset": -direction * sl_pips * one_pip,
+        "tp_offset": direction * sl_pips * one_pip * rr_ratio,
+    }
+
+
+@timed("send_order")
+def send_order(template, started = None):
+    """
+    Fills price, SL and TP into a prepared template and sends it, rounded to the symbol's digits
+    so the terminal doesn't reject an SL or TP like 1.0812300000000001.
+
+    The time from started (default: the call of send_order) to the hand-over to
+    order_send and the duration of order_send are appended to order_timings.
+
+    :return: The order_send result.
+    """
+    if started is None:
+        started = time.perf_counter()
+    mt5 = _terminal()
+    price = template["stop_limit_price"]
+    if price == None:
+        price = mt5.symbol_info_tick(template["request"]["symbol"]).ask
+
+    digits = template["digits"]
+    request = dict(template["request"])
+    request["price"] = round(price, digits)
+    request["stoplimit"] = request["price"]
+    request["sl"] = round(price + template["sl_offset"], digits)
+    request["tp"] = round(price + template["tp_offset"], digits)
+
+    sending = time.perf_counter()
+    result = mt5.order_send(request)
+    sent = time.perf_counter()
+    record("order_send", sent - sending)
+    order_timings.append({
+        "symbol": request["symbol"],
+        "time_to_send_ms": (sending - started) * 1000,
+        "order_send_ms": (sent - sending) * 1000,
+    })
+
+    # Reporting happens after the order is on the wire
+    order_kind = "Market" if template["stop_limit_price"] == None else "Limit"
+    logger.info(f"{order_kind} order at {request['price']} with {request['symbol']}, lot size {request['volume']}, "
+                f"type {request['type']}, SL {request['sl']}, TP {request['tp']}")
+    logger.debug(f"Time to send: {order_timings[-1]['time_to_send_ms']:.3f} ms, order_send: {order_timings[-1]['order_send_ms']:.1f} ms")
+    logger.info(result)
+    return result
+
+
+@timed("create_mt5_order")
+def create_mt5_order(lot_size, symbol, is_buy: bool, sl_pips, stop_limit_price = None, rr_ratio = 3):
+    """
+    Prepares and sends an order in one go; entries known beforehand should prepare_order early and only send_order.
+    """
+    started = time.perf_counter()
+    template = prepare_order(lot_size, symbol, is_buy, sl_pips, stop_limit_price, rr_ratio)
+    return send_order(template, started)
+
+def create_mt5_order_market(lot_size, symbol, is_buy: bool, sl_pips):
+    return create_mt5_order(lot_size, symbol, is_buy, sl_pips)
+
+def create_mt5_order_stop_limit(lot_size, symbol, is_buy: bool, sl_pips, stop_limit_price):
+    return create_mt5_order(lot_size, symbol, is_buy, sl_pips, stop_limit_price)
@@ -0,0 +1,504 @@
+import argparse
+import asyncio
+import bisect
+import calendar
+import datetime
+import importlib
+import itertools
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .bookoo_backtest_engine import find_first_passage
+from . import rate_provider
+from .deal_ledger import DealLedger
+from .portfolio_backtest import leg_path
+from .position_watcher import PositionWatcher
+from .tick_store import CSV_COLUMNS, Ticks, load_ticks
+
+logger = logging.getLogger(__name__)
+
+CONTRACT_SIZE = 100000  # Units per 1 standard lot
+DEFAULT_BALANCE = 10000.0
+DEFAULT_LEVERAGE = 30
+
+# The records the MetaTrader5 package returns, with the fields the trading code reads
+AccountInfo = namedtuple("AccountInfo", ["login", "balance", "equity", "profit", "margin", "margin_free", "leverage", "currency"])
+SymbolInfo = namedtuple("SymbolInfo", ["name", "point", "digits", "trade_contract_size", "volume_min", "volume_max", "volume_step",
+                                       "filling_mode", "bid", "ask", "currency_base", "currency_profit", "visible"])
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+TradePosition = namedtuple("TradePosition", ["ticket", "time", "time_msc", "type", "volume", "price_open", "sl", "tp",
+                                             "price_current", "profit", "symbol", "comment"])
+TradeDeal = namedtuple("TradeDeal", ["ticket", "order", "time", "time_msc", "type", "entry", "reason", "position_id", "volume",
+                                     "price", "commission", "swap", "profit", "symbol", "comment"])
+OrderSendResult = namedtuple("OrderSendResult", ["retcode", "deal", "order", "volume", "price", "bid", "ask", "comment",
+                                                 "request_id", "retcode_external", "request"])
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by the virtual clock once it is asked to go past the last recorded tick.
+    """
+
+
+def csv_ticks(csv_path):
+    """
+    Reads a downloaded tick CSV (timestamp in ms, askPrice, bidPrice) into Ticks.
+    """
+    frame = pd.read_csv(csv_path, usecols=list(CSV_COLUMNS.values()))
+    return Ticks(**{column: frame[csv_column].to_numpy() for column, csv_column in CSV_COLUMNS.items()})
+
+
+def _to_seconds(value):
+    # Naive datetimes are server time, like deal.time, so no local timezone is applied
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.timetuple())
+    return int(value)
+
+
+class ReplayTerminal:
+    """
+    Stand-in for the MetaTrader5 module that replays recorded ticks on a virtual clock.
+
+    Install it with install() before the trading code imports MetaTrader5 and
+    the code sees a terminal whose market is the recorded ticks. Market orders
+    fill at the current tick's ask (buy) or bid (sell). A position closes on
+    the first later tick whose bid (long) or ask (short) touches its SL or TP,
+    at that tick's price, with a closing deal of the opposite type carrying
+    the profit, exactly like the server books it. The close tick of a position
+    is searched once when it opens, so advancing the clock is a cursor move.
+
+    The clock starts once every symbol has ticked, so every rate the replayed
+    pairs provide is known from the first poll, and only moves through sleep(). While
+    every replayed symbol has an open position nothing can happen until the
+    next SL/TP fill, so sleep() jumps straight to it: a year of ticks costs
+    about as many polls as there are trades.
+
+    Only market orders are simulated; pending orders are rejected with
+    TRADE_RETCODE_INVALID. There is no commission, swap or stops level.
+
+    :param ticks: Dictionary of symbol -> Ticks(timestamp, bid, ask), timestamp in ms since epoch
+    :param balance: Starting balance in the account currency
+    :param leverage: Account leverage, used for the margin of open positions
+    :param currency: Account currency
+    :param conversion_rates: Fixed {currency: units per account currency} for currencies no replayed symbol prices
+    :raises ValueError: If a currency of the symbols can't be converted to the account currency through
+        the replayed symbols and conversion_rates.
+    """
+
+    # Constant values of the MetaTrader5 package
+    TRADE_ACTION_DEAL = 1
+    TRADE_ACTION_PENDING = 5
+    SYMBOL_TRADE_EXECUTION_MARKET = 2
+    ORDER_TYPE_BUY = 0
+    ORDER_TYPE_SELL = 1
+    ORDER_TYPE_BUY_STOP_LIMIT = 6
+    ORDER_TYPE_SELL_STOP_LIMIT = 7
+    ORDER_TIME_GTC = 0
+    ORDER_FILLING_FOK = 0
+    ORDER_FILLING_IOC = 1
+    ORDER_FILLING_RETURN = 2
+    SYMBOL_FILLING_FOK = 1
+    SYMBOL_FILLING_IOC = 2
+    DEAL_TYPE_BUY = 0
+    DEAL_TYPE_SELL = 1
+    DEAL_ENTRY_IN = 0
+    DEAL_ENTRY_OUT = 1
+    DEAL_REASON_EXPERT = 3
+    DEAL_REASON_SL = 4
+    DEAL_REASON_TP = 5
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_MARKET_CLOSED = 10018
+    TRADE_RETCODE_NO_MONEY = 10019
+
+    def __init__(self, ticks, balance=DEFAULT_BALANCE, leverage=DEFAULT_LEVERAGE, currency="EUR", conversion_rates=None):
+        if not ticks:
+            raise ValueError("No ticks to replay")
+        self.ticks = {
+            symbol: Ticks(np.asarray(t.timestamp, dtype=np.int64), np.asarray(t.bid, dtype=np.float64), np.asarray(t.ask, dtype=np.float64))
+            for symbol, t in ticks.items() if len(t.timestamp)
+        }
+        self.balance = float(balance)
+        self.leverage = leverage
+        self.currency = currency
+        self.conversion_rates = conversion_rates or {}
+        # Replayed pairs first, so a cross through them is preferred to a fixed rate of the same length
+        self._rate_pairs = list(self.ticks) + [self.currency + quote for quote in self.conversion_rates]
+        self._paths = {}
+        for symbol in self.ticks:
+            for currency in (symbol[:3], symbol[3:6]):
+                self._path(self.currency, currency)
+
+        self.now_ms = max(int(t.timestamp[0]) for t in self.ticks.values())
+        self.end_ms = max(int(t.timestamp[-1]) for t in self.ticks.values())
+        self._cursor = {}
+        self.positions = {}  # ticket -> position dict, see _open
+        self.deals = []
+        self._deal_times = []
+        self._tickets = itertools.count(1)
+        self._move_cursors()
+
+    # Virtual clock
+
+    def now(self):
+        """
+        Current virtual time as a naive datetime in server time, e.g. for DealLedger(now=...).
+        """
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(milliseconds=self.now_ms)
+
+    def monotonic(self):
+        return self.now_ms / 1000
+
+    def utc_time(self):
+        """
+        Current virtual time in seconds since the epoch, the recorded ticks are in UTC.
+        """
+        return self.now_ms / 1000
+
+    def sleep(self, seconds):
+        """
+        Advances the virtual clock, filling every SL/TP touched on the way.
+
+        :raises ReplayFinished: When the clock would pass the last recorded tick.
+        """
+        target = self.now_ms + int(seconds * 1000)
+        open_symbols = {position["symbol"] for position in self.positions.values()}
+        if open_symbols.issuperset(self.ticks):
+            close_times = [position["close_ms"] for position in self.positions.values() if position["close_ms"] is not None]
+            if not close_times:
+                raise ReplayFinished()
+            target = max(target, min(close_times))
+        if target > self.end_ms:
+            raise ReplayFinished()
+        self.now_ms = target
+        self._move_cursors()
+        self._fill_stops()
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+    def _move_cursors(self):
+        for symbol, ticks in self.ticks.items():
+            self._cursor[symbol] = int(np.searchsorted(ticks.timestamp, self.now_ms, side="right")) - 1
+
+    def _current(self, symbol):
+        index = self._cursor.get(symbol, -1)
+        if index < 0:
+            return None
+        ticks = self.ticks[symbol]
+        return index, int(ticks.timestamp[index]), float(ticks.bid[index]), float(ticks.ask[index])
+
+    # Prices and money
+
+    def _path(self, base, quote):
+        path = self._paths.get((base, quote))
+        if path is None:
+            path = leg_path(base, quote, self._rate_pairs)
+            if path is None:
+                raise ValueError(f"No {base}{quote} rate: no chain of replayed symbols or conversion_rates connects "
+                                 f"{base} and {quote}, replay a pair of {quote} or give its rate")
+            self._paths[(base, quote)] = path
+        return path
+
+    def _cross_rate(self, base, quote):
+        """
+        Units of quote per unit of base at the current ticks, chained through the replayed pairs
+        and conversion_rates like portfolio_backtest.leg_path, e.g. EURJPY from EURUSD and USDJPY.
+        """
+        rate = 1.0
+        for pair, power in self._path(base, quote):
+            if pair in self.ticks:
+                current = self._current(pair)
+                mid = (current[2] + current[3]) / 2
+            else:
+                mid = self.conversion_rates[pair[3:6]]
+            rate *= mid ** power
+        return rate
+
+    def rate_source(self, symbols):
+        """
+        Rate source for rate_provider serving Yahoo symbols like EURUSD=X from the replayed ticks.
+        """
+        rates = {}
+        for symbol in symbols:
+            pair = symbol.replace("=X", "")
+            try:
+                rates[symbol] = self._cross_rate(pair[:3], pair[3:6])
+            except ValueError:
+                rates[symbol] = None
+        return rates
+
+    def _profit(self, position, price):
+        direction = 1 if position["type"] == self.ORDER_TYPE_BUY else -1
+        quote_profit = (price - position["price_open"]) * direction * position["volume"] * CONTRACT_SIZE
+        return quote_profit / self._cross_rate(self.currency, position["symbol"][3:6])
+
+    def _margin(self, symbol, volume):
+        return volume * CONTRACT_SIZE / self._cross_rate(self.currency, symbol[:3]) / self.leverage
+
+    def _close_price(self, position, bid, ask):
+        return bid if position["type"] == self.ORDER_TYPE_BUY else ask
+
+    # Orders and fills
+
+    def _add_deal(self, **fields):
+        deal = TradeDeal(ticket=next(self._tickets), commission=0.0, swap=0.0, **fields)
+        self.deals.append(deal)
+        self._deal_times.append(deal.time)
+        return deal
+
+    def _open(self, symbol, order_type, volume, sl, tp, comment):
+        index, time_msc, bid, ask = self._current(symbol)
+        is_buy = order_type == self.ORDER_TYPE_BUY
+        price = ask if is_buy else bid
+        ticks = self.ticks[symbol]
+        # Longs close on the bid and shorts on the ask, an SL or TP of 0/None is not set
+        upper, lower = (tp or np.inf, sl or -np.inf) if is_buy else (sl or np.inf, tp or -np.inf)
+        close_index = find_first_passage(ticks.bid if is_buy else ticks.ask, index + 1, upper, lower)
+        ticket = next(self._tickets)
+        self.positions[ticket] = {
+            "ticket": ticket, "symbol": symbol, "type": order_type, "volume": volume, "price_open": price,
+            "sl": sl or 0.0, "tp": tp or 0.0, "time_msc": time_msc, "comment": comment,
+            "close_index": close_index, "close_ms": None if close_index < 0 else int(ticks.timestamp[close_index]),
+        }
+        deal = self._add_deal(order=ticket, time=time_msc // 1000, time_msc=time_msc, type=order_type, entry=self.DEAL_ENTRY_IN,
+                              reason=self.DEAL_REASON_EXPERT, position_id=ticket, volume=volume, price=price, profit=0.0,
+                              symbol=symbol, comment=comment)
+        return deal, price, bid, ask
+
+    def _fill_stops(self):
+        due = [position for position in self.positions.values()
+               if position["close_ms"] is not None and position["close_ms"] <= self.now_ms]
+        for position in sorted(due, key=lambda position: (position["close_ms"], position["ticket"])):
+            ticks = self.ticks[position["symbol"]]
+            index = position["close_index"]
+            price = self._close_price(position, float(ticks.bid[index]), float(ticks.ask[index]))
+            profit = self._profit(position, price)
+            self.balance += profit
+            del self.positions[position["ticket"]]
+            time_msc = int(ticks.timestamp[index])
+            opposite = self.ORDER_TYPE_SELL if position["type"] == self.ORDER_TYPE_BUY else self.ORDER_TYPE_BUY
+            self._add_deal(order=0, time=time_msc // 1000, time_msc=time_msc, type=opposite, entry=self.DEAL_ENTRY_OUT,
+                           reason=self.DEAL_REASON_TP if profit >= 0 else self.DEAL_REASON_SL, position_id=position["ticket"],
+                           volume=position["volume"], price=price, profit=profit, symbol=position["symbol"],
+                           comment="[tp]" if profit >= 0 else "[sl]")
+
+    # MetaTrader5 API
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return (1, "Success")
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self.ticks
+
+    def account_info(self):
+        floating = 0.0
+        margin = 0.0
+        for position in self.positions.values():
+            current = self._current(position["symbol"])
+            floating += self._profit(position, self._close_price(position, current[2], current[3]))
+            margin += self._margin(position["symbol"], position["volume"])
+        equity = self.balance + floating
+        return AccountInfo(login=0, balance=self.balance, equity=equity, profit=floating, margin=margin,
+                           margin_free=equity - margin, leverage=self.leverage, currency=self.currency)
+
+    def symbol_info(self, symbol):
+        if symbol not in self.ticks:
+            return None
+        digits = 3 if symbol[3:6] == "JPY" else 5
+        current = self._current(symbol)
+        return SymbolInfo(name=symbol, point=10.0 ** -digits, digits=digits, trade_contract_size=CONTRACT_SIZE,
+                          volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                          filling_mode=self.SYMBOL_FILLING_FOK | self.SYMBOL_FILLING_IOC,
+                          bid=0.0 if current is None else current[2], ask=0.0 if current is None else current[3],
+                          currency_base=symbol[:3], currency_profit=symbol[3:6], visible=True)
+
+    def symbol_info_tick(self, symbol):
+        current = self._current(symbol)
+        if current is None:
+            return None
+        _, time_msc, bid, ask = current
+        return Tick(time=time_msc // 1000, bid=bid, ask=ask, last=0.0, volume=0, time_msc=time_msc, flags=6, volume_real=0.0)
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        positions = []
+        for position in self.positions.values():
+            if symbol is not None and position["symbol"] != symbol:
+                continue
+            if ticket is not None and position["ticket"] != ticket:
+                continue
+            current = self._current(position["symbol"])
+            price_current = self._close_price(position, current[2], current[3])
+            positions.append(TradePosition(
+                ticket=position["ticket"], time=position["time_msc"] // 1000, time_msc=position["time_msc"], type=position["type"],
+                volume=position["volume"], price_open=position["price_open"], sl=position["sl"], tp=position["tp"],
+                price_current=price_current, profit=self._profit(position, price_current), symbol=position["symbol"],
+                comment=position["comment"]))
+        return tuple(positions)
+
+    def history_deals_get(self, date_from, date_to, group=None):
+        start = bisect.bisect_left(self._deal_times, _to_seconds(date_from))
+        stop = bisect.bisect_right(self._deal_times, _to_seconds(date_to))
+        return tuple(self.deals[start:stop])
+
+    def order_send(self, request):
+        def result(retcode, comment, deal=0, order=0, price=0.0, bid=0.0, ask=0.0):
+            return OrderSendResult(retcode=retcode, deal=deal, order=order, volume=request.get("volume", 0.0), price=price,
+                                   bid=bid, ask=ask, comment=comment, request_id=0, retcode_external=0, request=request)
+
+        symbol = request.get("symbol")
+        if symbol not in self.ticks:
+            return result(self.TRADE_RETCODE_INVALID, "Unknown symbol")
+        # The bot sends SYMBOL_TRADE_EXECUTION_MARKET as the action of its market orders
+        if request.get("action") not in (self.TRADE_ACTION_DEAL, self.SYMBOL_TRADE_EXECUTION_MARKET) \
+                or request.get("type") not in (self.ORDER_TYPE_BUY, self.ORDER_TYPE_SELL):
+            return result(self.TRADE_RETCODE_INVALID, "Only market orders are replayed")
+        if self._current(symbol) is None:
+            return result(self.TRADE_RETCODE_MARKET_CLOSED, "Market closed")
+        volume = request.get("volume") or 0.0
+        if volume < 0.01 or volume > 100 or abs(round(volume / 0.01) * 0.01 - volume) > 1e-9:
+            return result(self.TRADE_RETCODE_INVALID_VOLUME, "Invalid volume")
+        if self._margin(symbol, volume) > self.account_info().margin_free:
+            return result(self.TRADE_RETCODE_NO_MONEY, "No money")
+
+        deal, price, bid, ask = self._open(symbol, request["type"], volume, request.get("sl"), request.get("tp"),
+                                           request.get("comment", ""))
+        return result(self.TRADE_RETCODE_DONE, "Request executed", deal=deal.ticket, order=deal.order, price=price, bid=bid, ask=ask)
+
+    # Results
+
+    def deals_frame(self):
+        """
+        All deals as a DataFrame, closing deals carry the profit.
+        """
+        frame = pd.DataFrame(self.deals, columns=TradeDeal._fields)
+        frame["time_msc"] = pd.to_datetime(frame["time_msc"], unit="ms")
+        return frame
+
+
+def install(terminal):
+    """
+    Makes `import MetaTrader5` return the terminal from now on.
+    """
+    sys.modules["MetaTrader5"] = terminal
+    return terminal
+
+
+def load_bot(terminal, log_level=logging.WARNING):
+    """
+    Imports bookoo_strat_bot against the terminal instead of a real MetaTrader5.
+
+    :param log_level: Level of the bot's log, DEBUG logs every decision
+    :return: The bot module, with its deal ledger on the terminal's virtual clock.
+    """
+    install(terminal)
+    bot = importlib.import_module(".bookoo_strat_bot", __package__)
+    # Keep the replay's log file out of the working directory
+    bot.configure_logging(os.environ.get("BOOKOO_LOG_DIR", tempfile.gettempdir()))
+    logging.getLogger().setLevel(log_level)
+
+    bot.mt5 = terminal
+    # Orders go out through mt5_dao, which may have been imported against another terminal
+    mt5_dao = importlib.import_module(".mt5_dao", __package__)
+    mt5_dao.mt5 = terminal
+    mt5_dao.invalidate_symbol_info()
+    bot.deal_ledger = DealLedger(terminal, now=terminal.now)
+    return bot
+
+
+def replay_bot(terminal, symbols=None, stop_loss_pips=None, start_direction=None, log_level=logging.WARNING):
+    """
+    Runs the strategies and position watcher of bookoo_strat_bot unchanged over the terminal's ticks.
+
+    The bot module is imported against the terminal, its deal ledger, the rate
+    cache, the watcher and time.sleep all run on the virtual clock until the
+    ticks run out.
+
+    :param symbols: Symbols to trade, bot_symbols of the bot by default
+    :param stop_loss_pips: Stop loss in pips, the bot's stop_loss_pips_input by default
+    :param start_direction: LONG or SHORT, the bot's startDirection by default
+    :param log_level: Level of the bot's log while replaying, DEBUG logs every decision
+    :return: List of the BookooStrategy objects, with their win/loss statistics.
+    """
+    bot = load_bot(terminal, log_level)
+    rate_provider.default_cache = rate_provider.RateCache(source=terminal.rate_source, max_stale=rate_provider.DEFAULT_TTL,
+                                                          clock=terminal.monotonic)
+
+    symbols = symbols or [symbol for symbol in bot.bot_symbols if symbol in terminal.ticks]
+    stop_loss_pips = bot.stop_loss_pips_input if stop_loss_pips is None else stop_loss_pips
+    start_direction = start_direction or bot.startDirection
+    exclusive = len(symbols) == 1
+    strategies = [bot.BookooStrategy(symbol, stop_loss_pips, start_direction, exclusive, clock=terminal.utc_time)
+                  for symbol in symbols]
+    for strategy in strategies:
+        strategy.prepare_first_entry()
+    watcher = PositionWatcher(terminal, {strategy.symbol: strategy.on_flat for strategy in strategies},
+                              clock=terminal.monotonic, sleep=terminal.async_sleep)
+
+    real_sleep = time.sleep
+    time.sleep = terminal.sleep
+    try:
+        asyncio.run(watcher.run())
+    except ReplayFinished:
+        pass
+    finally:
+        time.sleep = real_sleep
+    return strategies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded ticks through the live bot on a virtual clock")
+    parser.add_argument("symbols", nargs="+", help="Symbols to trade, read from the tick store or SYMBOL=path.csv")
+    parser.add_argument("--rate-symbols", nargs="*", default=[],
+                        help="Symbols only replayed for conversion rates, e.g. EURJPY, read like the traded ones")
+    parser.add_argument("--rate", action="append", default=[], metavar="CUR=RATE",
+                        help="Fixed rate of a currency no replayed symbol prices, in units per EUR, e.g. JPY=162.3")
+    parser.add_argument("--store", help="Root directory of the tick store")
+    parser.add_argument("--start", help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last day, YYYY-MM-DD")
+    parser.add_argument("--sl", type=float, default=5, help="Stop loss in pips")
+    parser.add_argument("--direction", default="SHORT", choices=["LONG", "SHORT"])
+    parser.add_argument("--balance", type=float, default=DEFAULT_BALANCE)
+    parser.add_argument("--deals", help="Write the deals to this CSV")
+    args = parser.parse_args(argv)
+
+    ticks = {}
+    for argument in args.symbols + args.rate_symbols:
+        symbol, _, csv_path = argument.partition("=")
+        ticks[symbol] = csv_ticks(csv_path) if csv_path else load_ticks(args.store, symbol, args.start, args.end)
+    conversion_rates = {}
+    for argument in args.rate:
+        currency, _, rate = argument.partition("=")
+        conversion_rates[currency] = float(rate)
+
+    started = time.perf_counter()
+    try:
+        terminal = ReplayTerminal(ticks, balance=args.balance, conversion_rates=conversion_rates)
+    except ValueError as error:
+        parser.error(str(error))
+    strategies = replay_bot(terminal, [argument.partition("=")[0] for argument in args.symbols], args.sl, args.direction)
+    seconds = time.perf_counter() - started
+
+    for strategy in strategies:
+        print(f"{strategy.symbol}: {strategy.stat_win_trades} wins, {strategy.stat_loss_trades} losses")
+    print(f"Balance: {terminal.balance:.2f} after {len(terminal.deals)} deals, replayed in {seconds:.1f} s")
+    if args.deals:
+        terminal.deals_frame().to_csv(args.deals, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .bookoo_backtest_engine import PIP
+from .session_calendar import MS_PER_DAY, SESSIONS, session_windows
+
+CONTRACT_SIZE = 100000  # Units per 1 standard lot
+
+
+class RunningStats:
+    """
+    Welford's online mean and variance, numerically stable and O(1) per value.
+
+    variance is the population variance, like np.var and np.std use by default.
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class PerformanceTracker:
+    """
+    Online performance of a strategy, updated in O(1) per closed trade.
+
+    Keeps the trade counts, Welford mean/variance of the trade P&L (for the
+    Sharpe ratio), the equity curve's running peak and maximum drawdown, the
+    current and longest win/loss streaks and the P&L per trading session.
+    The live bot feeds it the profit of every closing deal, the backtest the
+    P&L of every streamed trade; trade_performance computes the same summary
+    from a finished list of trades in one vectorized pass.
+
+    :param starting_equity: Equity before the first trade, the drawdown is measured from it
+    :param sessions: Session name -> (open, close) UTC time of day, see session_calendar.SESSIONS. A trade
+        counts for every session whose window holds its time of day, both ends inclusive as in SessionCalendar
+    """
+
+    def __init__(self, starting_equity=0.0, sessions=SESSIONS):
+        self.returns = RunningStats()
+        self.wins = 0
+        self.losses = 0
+        self.profit = 0.0
+        self.equity = starting_equity
+        self.peak = starting_equity
+        self.max_drawdown = 0.0
+        self.streak = 0  # Positive: wins in a row, negative: losses in a row
+        self.longest_win_streak = 0
+        self.longest_loss_streak = 0
+        self.session_profit = {name: 0.0 for name in sessions}
+        self.session_trades = {name: 0 for name in sessions}
+        self._session_windows = list(session_windows(sessions).items())
+
+    def update(self, pnl, time_ms=None, is_win=None):
+        """
+        Adds one closed trade.
+
+        :param pnl: P&L of the trade, in pips or money
+        :param time_ms: Time of the trade in ms since epoch (UTC), None skips the session P&L
+        :param is_win: Outcome, by default a trade without a loss (pnl >= 0) is a win as in the bot
+        """
+        if is_win is None:
+            is_win = pnl >= 0
+        self.returns.update(pnl)
+        self.profit += pnl
+        self.equity += pnl
+        if self.equity > self.peak:
+            self.peak = self.equity
+        elif self.peak - self.equity > self.max_drawdown:
+            self.max_drawdown = self.peak - self.equity
+
+        if is_win:
+            self.wins += 1
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.longest_win_streak = max(self.longest_win_streak, self.streak)
+        else:
+            self.losses += 1
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+            self.longest_loss_streak = max(self.longest_loss_streak, -self.streak)
+
+        if time_ms is not None:
+            time_of_day = time_ms % MS_PER_DAY
+            for name, (open_ms, close_ms) in self._session_windows:
+                if open_ms <= time_of_day <= close_ms:
+                    self.session_profit[name] += pnl
+                    self.session_trades[name] += 1
+
+    def update_trade(self, trade_detail, pip=PIP, lot_size=None, contract_size=CONTRACT_SIZE):
+        """
+        Adds one trade_details dict of simulate_trades or stream_trades, see trade_pnl.
+        """
+        pnl = trade_pnl(trade_detail, pip, lot_size, contract_size)
+        self.update(pnl, pd.Timestamp(trade_detail['entry_time']).value // 1_000_000, trade_detail['outcome'] == 'win')
+
+    @property
+    def trades(self):
+        return self.wins + self.losses
+
+    @property
+    def win_ratio(self):
+        return self.wins / self.trades if self.trades else 0
+
+    @property
+    def sharpe_ratio(self):
+        std = self.returns.std
+        return self.returns.mean / std if std != 0 else 0
+
+    def summary(self):
+        return {
+            "trades": self.trades,
+            "wins": self.wins,
+            "losses": self.losses,
+            "win_ratio": self.win_ratio,
+            "profit": self.profit,
+            "mean": self.returns.mean,
+            "std": self.returns.std,
+            "sharpe_ratio": self.sharpe_ratio,
+            "max_drawdown": self.max_drawdown,
+            "longest_win_streak": self.longest_win_streak,
+            "longest_loss_streak": self.longest_loss_streak,
+            "session_profit": dict(self.session_profit),
+            "session_trades": dict(self.session_trades),
+        }
+
+
+def trade_pnl(trade_detail, pip=PIP, lot_size=None, contract_size=CONTRACT_SIZE):
+    """
+    P&L of one trade_details dict, in pips, or in the quote currency when lot_size is given.
+    """
+    direction = 1 if trade_detail['direction'] == 'long' else -1
+    pips = (trade_detail['exit_price'] - trade_detail['entry_price']) * direction / pip
+    return pips if lot_size is None else pips * pip * lot_size * contract_size
+
+
+def _longest_run(mask):
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def trade_performance(trade_details, pip=PIP, lot_size=1.0, contract_size=CONTRACT_SIZE, starting_equity=0.0,
+                      sessions=SESSIONS):
+    """
+    Vectorized P&L, equity curve and drawdown of a finished list of trades.
+
+    :param trade_details: List of trade_details dicts of simulate_trades or stream_trades, or a
+        trade_log.trades_to_details_frame
+    :param pip: Price size of one pip
+    :param lot_size: Lots traded per trade, the money P&L is in the quote currency
+    :param starting_equity: Equity before the first trade
+    :return: (frame, summary): the trades with pnl_pips, pnl, equity, peak and drawdown
+        columns added, and the same summary as PerformanceTracker.summary on the pnl column.
+    """
+    frame = pd.DataFrame(trade_details, columns=['entry_time', 'entry_price', 'exit_price', 'direction', 'outcome'])
+    direction = np.where(frame['direction'].to_numpy() == 'long', 1, -1)
+    frame['pnl_pips'] = (frame['exit_price'].to_numpy(dtype=np.float64) - frame['entry_price'].to_numpy(dtype=np.float64)) * direction / pip
+    frame['pnl'] = frame['pnl_pips'] * pip * lot_size * contract_size
+    pnl = frame['pnl'].to_numpy()
+    equity = starting_equity + np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([starting_equity], equity)))[1:]
+    frame['equity'] = equity
+    frame['peak'] = peak
+    frame['drawdown'] = peak - equity
+
+    is_win = frame['outcome'].to_numpy() == 'win'
+    wins = int(np.count_nonzero(is_win))
+    std = float(pnl.std()) if len(pnl) else 0.0
+    mean = float(pnl.mean()) if len(pnl) else 0.0
+    entry_times = pd.DatetimeIndex(frame['entry_time'])
+    time_of_day = ((entry_times - entry_times.normalize()) // pd.Timedelta(milliseconds=1)).to_numpy(dtype=np.int64)
+    session_masks = {name: (time_of_day >= open_ms) & (time_of_day <= close_ms)
+                     for name, (open_ms, close_ms) in session_windows(sessions).items()}
+    summary = {
+        "trades": len(frame),
+        "wins": wins,
+        "losses": len(frame) - wins,
+        "win_ratio": wins / len(frame) if len(frame) else 0,
+        "profit": float(pnl.sum()),
+        "mean": mean,
+        "std": std,
+        "sharpe_ratio": mean / std if std != 0 else 0,
+        "max_drawdown": float(frame['drawdown'].max()) if len(frame) else 0.0,
+        "longest_win_streak": _longest_run(is_win),
+        "longest_loss_streak": _longest_run(~is_win),
+        "session_profit": {name: float(pnl[mask].sum()) for name, mask in session_masks.items()},
+        "session_trades": {name: int(np.count_nonzero(mask)) for name, mask in session_masks.items()},
+    }
+    return frame, summary
@@ -0,0 +1,323 @@
+import argparse
+import collections
+import functools
+import math
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .bookoo_backtest_engine import RR_RATIO
+from .performance_analytics import PerformanceTracker
+from .position_sizing import ACCOUNT_CURRENCY, symbol_metadata
+from .rate_provider import rate_pair_map
+from .tick_store import iter_ticks
+from .trade_log import TradeBuffer, iter_trade_blocks
+
+DEFAULT_BALANCE = 10000.0
+DEFAULT_RISK_PERCENT = 1.0
+DEFAULT_LEVERAGE = 30
+MIN_LOT = 0.01
+
+EXIT, ENTRY = 0, 1
+
+PortfolioResult = namedtuple("PortfolioResult", ["trades", "equity", "summary"])
+
+
+def store_sources(root, symbols, start=None, end=None, chunk_rows=1_000_000):
+    """
+    Tick sources of symbols in the tick store, see portfolio_backtest.
+
+    :return: Dictionary of symbol -> callable returning a fresh iter_ticks generator.
+    """
+    return {symbol: functools.partial(iter_ticks, root, symbol, start, end, chunk_rows) for symbol in symbols}
+
+
+def leg_path(base, quote, symbols):
+    """
+    How to price base -> quote from the available pairs, through as few pairs as possible.
+
+    E.g. EUR -> JPY from EURUSD and USDJPY is [("EURUSD", 1), ("USDJPY", 1)],
+    EUR -> AUD from EURUSD and AUDUSD is [("EURUSD", 1), ("AUDUSD", -1)].
+
+    :return: List of (symbol, power) whose mid prices raised to the power multiply to the rate,
+        empty when base is quote, None when the pairs don't connect the two currencies.
+    """
+    neighbours = collections.defaultdict(list)
+    for symbol in symbols:
+        neighbours[symbol[:3]].append((symbol[3:6], symbol, 1))
+        neighbours[symbol[3:6]].append((symbol[:3], symbol, -1))
+    paths = {base: []}
+    queue = collections.deque([base])
+    while queue:
+        currency = queue.popleft()
+        if currency == quote:
+            return paths[currency]
+        for other, symbol, power in neighbours[currency]:
+            if other not in paths:
+                paths[other] = paths[currency] + [(symbol, power)]
+                queue.append(other)
+    return None
+
+
+def asof_quotes(chunks, times):
+    """
+    As-of join of a tick stream onto query times: the bid and ask of the last tick at or before each time.
+
+    Reads the ticks one chunk at a time, so the memory is bounded by the chunk
+    and the number of query times, not by the length of the stream.
+
+    :param chunks: Iterable of (timestamp, bid, ask) arrays in time order
+    :param times: Query times in ms since epoch, ascending
+    :return: (bid, ask) arrays, NaN before the first tick.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    bid = np.full(len(times), np.nan)
+    ask = np.full(len(times), np.nan)
+    for timestamps, chunk_bid, chunk_ask in chunks:
+        if len(timestamps) == 0:
+            continue
+        # Later chunks overwrite the times they reach, which leaves the last tick at or before every time
+        first = np.searchsorted(times, timestamps[0], side="left")
+        rows = np.searchsorted(timestamps, times[first:], side="right") - 1
+        bid[first:] = chunk_bid[rows]
+        ask[first:] = chunk_ask[rows]
+    return bid, ask
+
+
+def _leg_rates(path, mids, count):
+    rate = np.ones(count)
+    for symbol, power in path:
+        rate = rate * mids[symbol] ** power
+    # Before the first tick of a leg pair its first known rate is used
+    known = np.flatnonzero(~np.isnan(rate))
+    if len(known):
+        rate[:known[0]] = rate[known[0]]
+    return rate
+
+
+def portfolio_backtest(sources, sl_pips, symbols=None, rr_ratio=RR_RATIO, start_direction='short',
+                       starting_balance=DEFAULT_BALANCE, risk_percent=DEFAULT_RISK_PERCENT, leverage=DEFAULT_LEVERAGE,
+                       account_currency=ACCOUNT_CURRENCY, rates=None):
+    """
+    Backtests the Bookoo strategy on several symbols at once with one shared account.
+
+    Every symbol runs its own flip-on-loss strategy with its own pip size
+    (0.01 for JPY quotes), as stream_trades would. The trades of all symbols
+    are then merged into one time-ordered stream of entries and exits and
+    replayed against a single account: each entry is sized like
+    calculate_lot_size from the balance at that moment and the account ->
+    quote currency rate at that tick, and capped by the free margin; each
+    exit books its P&L converted at the rate of the exit tick. Rates come
+    from as-of joins of the sources onto the entry and exit times, directly
+    or as a cross through the other pairs (USDJPY through EURUSD and USDJPY
+    when there is no EURJPY source). Every source is read twice in chunks,
+    once for the trades and once for the rates, so a year of the ten
+    rate_pair_map pairs never has to fit in memory.
+
+    Entries the free margin doesn't allow MIN_LOT for are skipped, the strategy
+    of the symbol carries on as if they had been taken. Positions still open
+    when the ticks end are left out, like in simulate_trades.
+
+    :param sources: Symbol -> callable returning an iterable of (timestamp, bid, ask) chunks,
+        called twice, e.g. store_sources
+    :param sl_pips: Stop loss in pips, or dictionary of symbol -> stop loss
+    :param symbols: Symbols traded, all sources by default; the other sources only price conversions
+    :param risk_percent: Percentage of the balance risked per trade
+    :param leverage: Account leverage, the margin of a lot is its base currency value / leverage
+    :param rates: Optional dictionary of Yahoo symbol ('EURJPY=X') -> fixed rate for legs no source prices
+    :return: PortfolioResult(trades, equity, summary): a DataFrame of every trade with its symbol,
+        lots, pnl (account currency) and balance after it; a DataFrame of the balance, equity,
+        margin and free_margin after every event time; and the PerformanceTracker summary plus
+        per symbol profit, equity drawdown and lowest margin level.
+    """
+    symbols = list(symbols or sources)
+    missing = [symbol for symbol in symbols if symbol not in sources]
+    if missing:
+        raise ValueError(f"No tick source for {', '.join(missing)}")
+    metadata = {symbol: symbol_metadata(symbol) for symbol in symbols}
+    if not isinstance(sl_pips, dict):
+        sl_pips = {symbol: sl_pips for symbol in symbols}
+    rates = rates or {}
+
+    # Every conversion as a path of source pairs, or a fixed rate
+    legs = {}
+    for symbol in symbols:
+        for currency in (metadata[symbol]["quote_currency"], metadata[symbol]["base_currency"]):
+            if currency in legs:
+                continue
+            yahoo_symbol = f"{account_currency}{currency}=X"
+            path = leg_path(account_currency, currency, list(sources))
+            if path is None and yahoo_symbol not in rates:
+                raise ValueError(f"No source or rate prices {yahoo_symbol}, add a source pair connecting the currencies")
+            legs[currency] = path if path is not None else rates[yahoo_symbol]
+
+    # Pass 1: the trades of every symbol, independent of the account
+    trades = {}
+    for symbol in symbols:
+        buffer = TradeBuffer()
+        for block in iter_trade_blocks(sources[symbol](), sl_pips[symbol], rr_ratio, start_direction,
+                                       metadata[symbol]["pip_size"]):
+            buffer.extend(block)
+        trades[symbol] = buffer.trades()
+
+    # k-way merge of the entry and exit events by time. At one time, exits of positions opened earlier come
+    # first, then the symbols' remaining events in their own order (a trade can open and close in the same ms)
+    event_time, event_group, event_symbol, event_sequence = [], [], [], []
+    for number, symbol in enumerate(symbols):
+        symbol_trades = trades[symbol]
+        count = len(symbol_trades.entry_time)
+        sequence = np.arange(count, dtype=np.int64) * 2
+        event_time += [symbol_trades.entry_time, symbol_trades.exit_time]
+        event_group += [np.ones(count, dtype=np.int8), (symbol_trades.exit_time == symbol_trades.entry_time).astype(np.int8)]
+        event_symbol += [np.full(count * 2, number, dtype=np.int64)]
+        event_sequence += [sequence, sequence + 1]
+    event_time, event_group, event_symbol, event_sequence = (np.concatenate(column) for column in
+                                                             (event_time, event_group, event_symbol, event_sequence))
+    order = np.lexsort((event_sequence, event_symbol, event_group, event_time))
+    event_time, event_symbol, event_sequence = event_time[order], event_symbol[order], event_sequence[order]
+    event_kind = np.where(event_sequence % 2 == 1, EXIT, ENTRY)
+    event_trade = event_sequence // 2
+    times, event_step = np.unique(event_time, return_inverse=True)
+
+    # Pass 2: as-of quotes of the traded and the conversion pairs at every event time
+    quoted = set(symbols) | {leg_symbol for leg in legs.values() if isinstance(leg, list) for leg_symbol, _ in leg}
+    quotes = {symbol: asof_quotes(sources[symbol](), times) for symbol in quoted}
+    mids = {symbol: (bid + ask) / 2 for symbol, (bid, ask) in quotes.items()}
+    leg_rates = {currency: np.full(len(times), leg, dtype=np.float64) if not isinstance(leg, list) else _leg_rates(leg, mids, len(times))
+                 for currency, leg in legs.items()}
+
+    # Replay the events against the shared account, on Python lists since every event is a few scalar operations
+    tracker = PerformanceTracker(starting_balance)
+    symbol_profit = {symbol: 0.0 for symbol in symbols}
+    lots = {symbol: np.zeros(len(trades[symbol].entry_time)) for symbol in symbols}
+    pnl = {symbol: np.zeros(len(trades[symbol].entry_time)) for symbol in symbols}
+    balance_after = {symbol: np.full(len(trades[symbol].entry_time), np.nan) for symbol in symbols}
+    columns = {symbol: {column: getattr(trades[symbol], column).tolist()
+                        for column in ("entry_time", "entry_price", "exit_price", "direction", "is_win")}
+               for symbol in symbols}
+    bids = {symbol: quotes[symbol][0].tolist() for symbol in symbols}
+    asks = {symbol: quotes[symbol][1].tolist() for symbol in symbols}
+    conversions = {currency: rate.tolist() for currency, rate in leg_rates.items()}
+    open_positions = {}  # Symbol -> (trade, direction, entry price, lots, margin)
+    balance = starting_balance
+    used_margin = 0.0
+    curve = np.empty((len(times), 4))
+    skipped = 0
+
+    def equity_at(step):
+        floating = 0.0
+        for symbol, (_, direction, entry_price, position_lots, _) in open_positions.items():
+            price = bids[symbol][step] if direction == 1 else asks[symbol][step]
+            floating += ((price - entry_price) * direction * position_lots * metadata[symbol]["contract_size"]
+                         / conversions[metadata[symbol]["quote_currency"]][step])
+        return balance + floating
+
+    event_step, event_symbol, event_trade, event_kind = (column.tolist() for column in
+                                                         (event_step, event_symbol, event_trade, event_kind))
+    for i, (step, number, trade, kind) in enumerate(zip(event_step, event_symbol, event_trade, event_kind)):
+        symbol = symbols[number]
+        meta = metadata[symbol]
+        conversion = conversions[meta["quote_currency"]][step]
+        if kind == ENTRY:
+            risk_amount = balance * risk_percent / 100
+            pip_value = meta["pip_size"] / conversion
+            position_lots = round(risk_amount / (sl_pips[symbol] * pip_value * meta["contract_size"]), 2)
+            margin_per_lot = meta["contract_size"] / conversions[meta["base_currency"]][step] / leverage
+            free_margin = equity_at(step) - used_margin
+            position_lots = min(position_lots, math.floor(max(free_margin, 0.0) / margin_per_lot * 100) / 100)
+            if position_lots < MIN_LOT:
+                skipped += 1
+            else:
+                direction = columns[symbol]["direction"][trade]
+                entry_price = columns[symbol]["entry_price"][trade]
+                open_positions[symbol] = (trade, direction, entry_price, position_lots, position_lots * margin_per_lot)
+                used_margin = sum(position[4] for position in open_positions.values())
+                lots[symbol][trade] = position_lots
+        elif symbol in open_positions and open_positions[symbol][0] == trade:
+            _, direction, entry_price, position_lots, _ = open_positions.pop(symbol)
+            used_margin = sum(position[4] for position in open_positions.values())
+            profit = ((columns[symbol]["exit_price"][trade] - entry_price) * direction * position_lots
+                      * meta["contract_size"] / conversion)
+            balance += profit
+            pnl[symbol][trade] = profit
+            balance_after[symbol][trade] = balance
+            symbol_profit[symbol] += profit
+            tracker.update(profit, columns[symbol]["entry_time"][trade], columns[symbol]["is_win"][trade])
+
+        if i + 1 == len(event_step) or event_step[i + 1] != step:
+            equity = equity_at(step)
+            curve[step] = balance, equity, used_margin, equity - used_margin
+
+    frames = []
+    for symbol in symbols:
+        symbol_trades = trades[symbol]
+        frames.append(pd.DataFrame({
+            "symbol": symbol,
+            "entry_time": np.asarray(symbol_trades.entry_time).astype("datetime64[ms]"),
+            "exit_time": np.asarray(symbol_trades.exit_time).astype("datetime64[ms]"),
+            "direction": np.where(symbol_trades.direction == 1, "long", "short"),
+            "outcome": np.where(symbol_trades.is_win, "win", "lose"),
+            "entry_price": symbol_trades.entry_price,
+            "exit_price": symbol_trades.exit_price,
+            "pnl_pips": (symbol_trades.exit_price - symbol_trades.entry_price) * symbol_trades.direction / metadata[symbol]["pip_size"],
+            "lots": lots[symbol],
+            "pnl": pnl[symbol],
+            "balance": balance_after[symbol],
+        }))
+    trade_frame = pd.concat(frames, ignore_index=True).sort_values(["exit_time", "entry_time"], kind="stable",
+                                                                  ignore_index=True)
+    equity_frame = pd.DataFrame(curve, columns=["balance", "equity", "margin", "free_margin"],
+                                index=pd.DatetimeIndex(times.astype("datetime64[ms]"), name="time"))
+
+    summary = tracker.summary()
+    equity = equity_frame["equity"].to_numpy()
+    peak = np.maximum.accumulate(np.concatenate(([starting_balance], equity)))[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin_level = np.where(equity_frame["margin"] > 0, equity / equity_frame["margin"].to_numpy() * 100, np.inf)
+    summary.update({
+        "starting_balance": starting_balance,
+        "balance": balance,
+        "skipped_entries": skipped,
+        "max_equity_drawdown": float((peak - equity).max()) if len(equity) else 0.0,
+        "min_margin_level": float(margin_level.min()) if len(margin_level) else np.inf,
+        "symbol_profit": symbol_profit,
+        "symbol_trades": {symbol: int(np.count_nonzero(lots[symbol])) for symbol in symbols},
+    })
+    return PortfolioResult(trade_frame, equity_frame, summary)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the Bookoo strategy on several symbols with one account")
+    parser.add_argument("root", help="Tick store directory, see tick_store.py")
+    parser.add_argument("--symbols", nargs="+", default=list(rate_pair_map), help="Symbols traded")
+    parser.add_argument("--rate-symbols", nargs="*", default=[],
+                        help="Stored symbols only used for conversion rates, e.g. EURJPY")
+    parser.add_argument("--sl-pips", type=float, default=5)
+    parser.add_argument("--rr-ratio", type=float, default=RR_RATIO)
+    parser.add_argument("--start", help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", help="Last day, YYYY-MM-DD")
+    parser.add_argument("--balance", type=float, default=DEFAULT_BALANCE)
+    parser.add_argument("--risk", type=float, default=DEFAULT_RISK_PERCENT, help="Percentage of the balance risked per trade")
+    parser.add_argument("--leverage", type=float, default=DEFAULT_LEVERAGE)
+    parser.add_argument("--trades-csv", help="Write the trades to this CSV")
+    args = parser.parse_args(argv)
+
+    sources = store_sources(args.root, args.symbols + [symbol for symbol in args.rate_symbols if symbol not in args.symbols],
+                            args.start, args.end)
+    result = portfolio_backtest(sources, args.sl_pips, args.symbols, args.rr_ratio, starting_balance=args.balance,
+                                risk_percent=args.risk, leverage=args.leverage)
+    summary = result.summary
+    print(f"Trades: {summary['trades']} ({summary['skipped_entries']} entries skipped for margin)")
+    print(f"Balance: {summary['starting_balance']:.2f} -> {summary['balance']:.2f} {ACCOUNT_CURRENCY}")
+    print(f"Win ratio: {summary['win_ratio']:.2%}, Sharpe ratio: {summary['sharpe_ratio']:.3f}")
+    print(f"Max drawdown: {summary['max_drawdown']:.2f} closed, {summary['max_equity_drawdown']:.2f} equity")
+    print(f"Lowest margin level: {summary['min_margin_level']:.0f}%")
+    for symbol, profit in summary["symbol_profit"].items():
+        print(f"  {symbol:8} {summary['symbol_trades'][symbol]:6} trades {profit:12.2f}")
+    if args.trades_csv:
+        result.trades.to_csv(args.trades_csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
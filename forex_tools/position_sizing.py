@@ -0,0 +1,155 @@
+import time
+
+import numpy as np
+
+from .rate_provider import ACCOUNT_CURRENCY, conversion_leg, get_current_price, margin_leg, rate_pair_map
+
+CONTRACT_SIZE = 100000  # Units per 1 standard lot
+
+
+def symbol_metadata(symbol):
+    """
+    Sizing metadata of a currency pair.
+
+    conversion_leg is the Yahoo symbol of the account -> quote currency rate
+    (pip values are in the quote currency), margin_leg the account -> base
+    currency rate (one lot is CONTRACT_SIZE units of the base currency).
+    A leg is empty when that currency is the account currency.
+    """
+    base, quote = symbol[:3], symbol[3:6]
+    return {
+        "symbol": symbol,
+        "pip_size": 0.01 if quote == "JPY" else 0.0001,
+        "contract_size": CONTRACT_SIZE,
+        "base_currency": base,
+        "quote_currency": quote,
+        "conversion_leg": conversion_leg(symbol),
+        "margin_leg": margin_leg(symbol),
+    }
+
+
+def build_symbol_table(symbols):
+    """
+    Column-wise metadata table of several symbols, see symbol_metadata.
+
+    :return: Dictionary of column -> numpy array, plus "row" mapping symbol -> row number.
+    """
+    rows = [symbol_metadata(symbol) for symbol in symbols]
+    table = {column: np.array([row[column] for row in rows]) for column in rows[0]}
+    table["pip_size"] = table["pip_size"].astype(np.float64)
+    table["contract_size"] = table["contract_size"].astype(np.float64)
+    table["row"] = {symbol: i for i, symbol in enumerate(symbols)}
+    return table
+
+
+SYMBOL_TABLE = build_symbol_table(list(rate_pair_map))
+
+
+def _leg_rates(legs, rates):
+    """
+    Rate of every leg, 1 where there is no leg, taken from rates or the shared rate cache.
+    """
+    unique_legs, inverse = np.unique(legs, return_inverse=True)
+    leg_values = np.empty(len(unique_legs), dtype=np.float64)
+    for i, leg in enumerate(unique_legs):
+        if not leg:
+            leg_values[i] = 1.0
+            continue
+        rate = rates.get(leg) if rates is not None else None
+        if rate is None:
+            rate = get_current_price(leg)
+        if rate is None:
+            raise ValueError(f"No conversion rate for {leg}")
+        leg_values[i] = rate
+    return leg_values[inverse]
+
+
+def batch_lot_sizes(symbols, account_balances, risk_percentages, stop_loss_pips, leverage=None, rates=None,
+                    table=SYMBOL_TABLE):
+    """
+    Array in, array out version of calculate_lot_size for many rows at once.
+
+    Every rate is looked up once per distinct conversion leg, the rest is plain
+    numpy arithmetic with the same formulas as calculate_lot_size.
+
+    :param symbols: Symbols of the rows, e.g. ["EURUSD", "USDJPY"]
+    :param account_balances: Account balance per row (or a scalar), in the account currency
+    :param risk_percentages: Percentage of the balance risked per row (or a scalar)
+    :param stop_loss_pips: Stop loss in pips per row (or a scalar)
+    :param leverage: Leverage per row (or a scalar), None skips the leverage cap
+    :param rates: Optional dictionary of Yahoo symbol -> rate, missing legs come from the rate cache
+    :param table: Symbol metadata table, see build_symbol_table
+    :return: Dictionary of numpy arrays: lot_size (rounded to 0.01 like calculate_lot_size),
+        change_per_pip, money_at_risk, max_lot_size and capped_lot_size (lot_size limited by max_lot_size).
+    """
+    unique_symbols, inverse = np.unique(np.asarray(symbols), return_inverse=True)
+    try:
+        rows = np.array([table["row"][symbol] for symbol in unique_symbols], dtype=np.intp)[inverse]
+    except KeyError as error:
+        raise ValueError(f"No metadata for symbol {error.args[0]}") from None
+
+    account_balances = np.asarray(account_balances, dtype=np.float64)
+    risk_percentages = np.asarray(risk_percentages, dtype=np.float64)
+    stop_loss_pips = np.asarray(stop_loss_pips, dtype=np.float64)
+    pip_size = table["pip_size"][rows]
+    contract_size = table["contract_size"][rows]
+    conversion = _leg_rates(table["conversion_leg"][rows], rates)
+
+    risk_amount = account_balances * (risk_percentages / 100)
+    pip_value = pip_size / conversion
+    lot_size = risk_amount / (stop_loss_pips * pip_value * contract_size)
+    money_at_risk = stop_loss_pips * pip_value * lot_size * contract_size
+    result = {
+        "lot_size": np.round(lot_size, 2),
+        "change_per_pip": np.round(money_at_risk / stop_loss_pips, 2),
+        "money_at_risk": money_at_risk,
+    }
+    if leverage is None:
+        result["max_lot_size"] = np.full(len(rows), np.inf)
+    else:
+        margin_rate = _leg_rates(table["margin_leg"][rows], rates)
+        result["max_lot_size"] = np.round(account_balances * np.asarray(leverage, dtype=np.float64) * margin_rate / contract_size, 2)
+    result["capped_lot_size"] = np.minimum(result["lot_size"], result["max_lot_size"])
+    return result
+
+
+def benchmark(rows=100_000, scalar_rows=2_000, seed=0):
+    """
+    Times batch_lot_sizes against calling calculate_lot_size row by row, with fixed rates.
+
+    :return: Dictionary with rows per second of both paths and the speedup.
+    """
+    from . import forex_calculators
+    from . import rate_provider
+
+    rng = np.random.default_rng(seed)
+    symbols = rng.choice(list(rate_pair_map), rows)
+    balances = rng.uniform(1_000, 100_000, rows)
+    risks = rng.uniform(0.25, 2, rows)
+    stop_losses = rng.uniform(2, 50, rows)
+    rates = {leg: 1.0 + i / 10 for i, leg in enumerate(sorted(set(rate_pair_map.values())))}
+
+    previous_cache = rate_provider.default_cache
+    rate_provider.configure(source=lambda legs: {leg: rates.get(leg) for leg in legs})
+    try:
+        started = time.perf_counter()
+        for i in range(scalar_rows):
+            forex_calculators.calculate_lot_size(balances[i], risks[i], stop_losses[i], symbols[i])
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batch_lot_sizes(symbols, balances, risks, stop_losses, rates=rates)
+        batch_seconds = time.perf_counter() - started
+    finally:
+        rate_provider.default_cache = previous_cache
+
+    scalar_rate = scalar_rows / scalar_seconds
+    batch_rate = rows / batch_seconds
+    return {"scalar_rows_per_s": scalar_rate, "batch_rows_per_s": batch_rate, "speedup": batch_rate / scalar_rate}
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    print(f"Scalar: {results['scalar_rows_per_s']:,.0f} rows/s")
+    print(f"Batch:  {results['batch_rows_per_s']:,.0f} rows/s")
+    print(f"Speedup: {results['speedup']:.0f}x")
@@ -0,0 +1,205 @@
+import asyncio
+import inspect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MIN_INTERVAL = 0.05  # Seconds between polls while ticks are coming in
+MAX_INTERVAL = 2.0  # Ceiling of the backoff while the market is quiet or closed
+BACKOFF_FACTOR = 1.5
+MAX_RETRY_INTERVAL = 30.0  # Ceiling of the backoff while re-entries keep failing
+REPORT_INTERVAL = 300.0  # Seconds between two latency reports in the log
+
+
+class SymbolWatch:
+    """
+    Watch state of one symbol: position seen on the last poll, re-entry retries and latencies.
+    """
+
+    def __init__(self, symbol, on_flat, min_interval=MIN_INTERVAL):
+        self.symbol = symbol
+        self.on_flat = on_flat
+        self.had_position = None
+        self.closed_at = None
+        self.last_poll = None
+        self.retry_interval = min_interval
+        self.next_attempt = 0.0
+        self.reentry_latencies = []
+        self.detection_windows = []
+        self.loop_count = 0
+        self.loop_total = 0.0
+        self.loop_max = 0.0
+        self.loop_last = 0.0
+
+    def record_loop(self, seconds):
+        self.loop_count += 1
+        self.loop_total += seconds
+        self.loop_last = seconds
+        self.loop_max = max(self.loop_max, seconds)
+
+    def report(self):
+        return {
+            "loops": self.loop_count,
+            "loop_mean_ms": self.loop_total / self.loop_count * 1000 if self.loop_count else 0.0,
+            "loop_max_ms": self.loop_max * 1000,
+            "loop_last_ms": self.loop_last * 1000,
+            "reentries": len(self.reentry_latencies),
+            "reentry_last_ms": self.reentry_latencies[-1] * 1000 if self.reentry_latencies else None,
+            "detection_window_last_ms": self.detection_windows[-1] * 1000 if self.detection_windows else None,
+        }
+
+
+class PositionWatcher:
+    """
+    Watches the positions of one or more symbols and calls their on_flat as soon as one has none.
+
+    Every cycle makes a single positions_get call for all symbols plus one
+    symbol_info_tick call on the first symbol as a market heartbeat, so the
+    polling cost hardly grows with the number of symbols. Polls run every
+    min_interval while new ticks arrive and back off towards max_interval while
+    the tick time stands still, a cycle without an answer from positions_get is
+    retried after min_interval. When on_flat leaves a symbol flat (e.g. a
+    rejected order) or raises, which is logged, its next call is delayed with
+    an exponential backoff instead of retrying on every poll, while the other
+    symbols keep trading.
+
+    The time from spotting a closed position to seeing the new one open is kept
+    per symbol in SymbolWatch.reentry_latencies (seconds), the time spent on a
+    symbol in each cycle in its loop latency statistics. The re-entry latency
+    starts at the poll that found the position closed, not at the close: the
+    deal times are in the broker's server time, which this clock can't be
+    compared with. How late the close may have been seen, the time since the
+    symbol's previous poll, is kept in SymbolWatch.detection_windows.
+
+    :param mt5: MetaTrader5 module, or any object with positions_get and symbol_info_tick
+    :param handlers: Dictionary of symbol -> callable or coroutine function entering the next position
+    :param clock: Monotonic clock in seconds, sleep: coroutine function waiting between polls;
+        both are replaced by a virtual clock when replaying history
+    """
+
+    def __init__(self, mt5, handlers, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 backoff_factor=BACKOFF_FACTOR, max_retry_interval=MAX_RETRY_INTERVAL,
+                 report_interval=REPORT_INTERVAL, clock=time.monotonic, sleep=asyncio.sleep):
+        self.mt5 = mt5
+        self.watches = {symbol: SymbolWatch(symbol, on_flat, min_interval) for symbol, on_flat in handlers.items()}
+        self.heartbeat_symbol = next(iter(handlers))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.max_retry_interval = max_retry_interval
+        self.report_interval = report_interval
+        self.clock = clock
+        self.sleep = sleep
+
+        self.interval = min_interval
+        self._last_tick_msc = None
+        self._next_report = clock() + report_interval
+        self._stopped = False
+
+    def open_symbols(self):
+        """
+        Symbols with an open position, None when the terminal gave no answer.
+        """
+        positions = self.mt5.positions_get()
+        return None if positions is None else {position.symbol for position in positions}
+
+    def _tick_moved(self):
+        tick = self.mt5.symbol_info_tick(self.heartbeat_symbol)
+        tick_msc = None if tick is None else tick.time_msc
+        moved = tick_msc != self._last_tick_msc
+        self._last_tick_msc = tick_msc
+        return moved
+
+    async def _call_on_flat(self, watch):
+        result = watch.on_flat()
+        if inspect.isawaitable(result):
+            await result
+
+    def _record_reentry(self, watch):
+        if watch.closed_at is None:
+            return
+        latency = self.clock() - watch.closed_at
+        watch.reentry_latencies.append(latency)
+        logger.info(f"{watch.symbol} detected close to re-entry latency: {latency * 1000:.1f} ms, "
+                    f"closed at most {watch.detection_windows[-1] * 1000:.1f} ms before it was detected")
+        watch.closed_at = None
+
+    async def _poll_symbol(self, watch, has_position):
+        previous_poll = watch.last_poll
+        watch.last_poll = self.clock()
+        if has_position:
+            if watch.had_position is False:
+                self._record_reentry(watch)
+            watch.had_position = True
+            watch.retry_interval = self.min_interval
+            return
+
+        if watch.had_position:
+            watch.closed_at = watch.last_poll
+            watch.detection_windows.append(watch.closed_at - previous_poll)
+            logger.debug(f"{watch.symbol} position closed")
+        watch.had_position = False
+        if self.clock() < watch.next_attempt:
+            return
+        try:
+            await self._call_on_flat(watch)
+        except Exception:
+            # One symbol's failure must not stop the others, it is retried with the backoff
+            logger.exception(f"{watch.symbol} re-entry failed")
+            self._back_off(watch)
+            return
+        open_symbols = self.open_symbols()
+        if open_symbols is None:
+            # Whether the entry opened is seen on the next poll
+            return
+        if watch.symbol in open_symbols:
+            self._record_reentry(watch)
+            watch.had_position = True
+            watch.retry_interval = self.min_interval
+        else:
+            self._back_off(watch)
+
+    def _back_off(self, watch):
+        watch.next_attempt = self.clock() + watch.retry_interval
+        watch.retry_interval = min(watch.retry_interval * self.backoff_factor, self.max_retry_interval)
+
+    async def poll(self):
+        """
+        One watch cycle: checks every symbol, re-enters the flat ones and returns the seconds to wait.
+        """
+        open_symbols = self.open_symbols()
+        if open_symbols is None:
+            # No answer is not the same as no positions, nothing is re-entered until one comes
+            logger.warning("positions_get returned None, polling again")
+            self.interval = self.min_interval
+            return self.interval
+        for watch in self.watches.values():
+            started = self.clock()
+            await self._poll_symbol(watch, watch.symbol in open_symbols)
+            watch.record_loop(self.clock() - started)
+
+        if self._tick_moved():
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+
+        if self.clock() >= self._next_report:
+            self._next_report = self.clock() + self.report_interval
+            for symbol, report in self.report().items():
+                logger.info(f"{symbol} latency: {report}")
+        return self.interval
+
+    def report(self):
+        """
+        Per-symbol loop and re-entry latency statistics.
+        """
+        return {symbol: watch.report() for symbol, watch in self.watches.items()}
+
+    async def run(self):
+        while not self._stopped:
+            interval = await self.poll()
+            await self.sleep(interval)
+
+    def stop(self):
+        self._stopped = True
@@ -0,0 +1,240 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .latency_metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Traded symbol -> Yahoo symbol of the EUR conversion rate used to size it
+rate_pair_map = {
+    "USDCHF": "EURCHF=X",
+    "EURUSD": "EURUSD=X",
+    "GBPUSD": "EURUSD=X",
+    "EURGBP": "EURGBP=X",
+    "USDJPY": "EURJPY=X",
+    "USDCAD": "EURCAD=X",
+    "AUDUSD": "EURUSD=X",
+    "AUDJPY": "EURJPY=X",
+    "GBPJPY": "EURJPY=X",
+    "NZDUSD": "EURUSD=X",
+}
+
+ACCOUNT_CURRENCY = "EUR"
+
+DEFAULT_TTL = 60  # Seconds a rate is served without refreshing
+DEFAULT_MAX_STALE = 3600  # Seconds a rate may be served while it is refreshed in the background
+DEFAULT_MAX_SIZE = 256
+
+
+def _yahoo_price(symbol):
+    import yfinance as yf
+
+    ticker_info = yf.Ticker(symbol).info
+    # Attempt to fetch the current price from various possible keys
+    possible_keys = ['regularMarketPrice', 'price', 'ask', 'bid']
+    for key in possible_keys:
+        if key in ticker_info:
+            return ticker_info[key]
+    return None  # Return None if no relevant key is found
+
+
+def yfinance_source(symbols):
+    """
+    Fetches rates from Yahoo Finance, every symbol in its own thread.
+
+    :param symbols: Yahoo ticker symbols, e.g. EURJPY=X
+    :return: Dictionary of symbol -> rate, None where no price was found.
+    """
+    symbols = list(symbols)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(symbols), 16))) as pool:
+        return dict(zip(symbols, pool.map(_yahoo_price, symbols)))
+
+
+def mt5_source(symbols):
+    """
+    Reads rates from the terminal's last tick of the cross pair (EURJPY=X -> EURJPY mid price).
+    """
+    import MetaTrader5 as mt5
+
+    rates = {}
+    for symbol in symbols:
+        tick = mt5.symbol_info_tick(symbol.replace("=X", ""))
+        rates[symbol] = None if tick is None else (tick.bid + tick.ask) / 2
+    return rates
+
+
+def fixture_source(path):
+    """
+    Builds a source that serves rates from a local JSON file of {symbol: rate}, for offline use.
+    """
+    with open(path) as f:
+        fixture = json.load(f)
+
+    def source(symbols):
+        return {symbol: fixture.get(symbol) for symbol in symbols}
+
+    return source
+
+
+class RateCache:
+    """
+    LRU cache of conversion rates in front of a rate source.
+
+    Fresh rates (younger than ttl) are returned straight away. Stale rates
+    (younger than max_stale) are returned too while a background thread
+    refreshes them, so only a missing or expired rate blocks on the source.
+    """
+
+    def __init__(self, source=yfinance_source, ttl=DEFAULT_TTL, max_stale=DEFAULT_MAX_STALE,
+                 max_size=DEFAULT_MAX_SIZE, clock=time.monotonic):
+        self.source = source
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_size = max_size
+        self.clock = clock
+        self._rates = OrderedDict()  # symbol -> (rate, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _store(self, rates):
+        now = self.clock()
+        with self._lock:
+            for symbol, rate in rates.items():
+                if rate is None:
+                    continue
+                self._rates[symbol] = (rate, now)
+                self._rates.move_to_end(symbol)
+            while len(self._rates) > self.max_size:
+                self._rates.popitem(last=False)
+
+    def _fetch(self, symbols):
+        try:
+            rates = self.source(symbols)
+        except Exception:
+            logger.exception(f"Fetching rates failed for {', '.join(symbols)}")
+            return {}
+        self._store(rates)
+        return rates
+
+    def _refresh_in_background(self, symbol):
+        with self._lock:
+            if symbol in self._refreshing:
+                return
+            self._refreshing.add(symbol)
+
+        def refresh():
+            try:
+                self._fetch([symbol])
+            finally:
+                with self._lock:
+                    self._refreshing.discard(symbol)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def get(self, symbol):
+        """
+        Returns the rate of a symbol, or None if the source has no price for it.
+        """
+        with self._lock:
+            cached = self._rates.get(symbol)
+            if cached is not None:
+                self._rates.move_to_end(symbol)
+        if cached is not None:
+            rate, fetched_at = cached
+            age = self.clock() - fetched_at
+            if age <= self.ttl:
+                return rate
+            if age <= self.max_stale:
+                self._refresh_in_background(symbol)
+                return rate
+        return self._fetch([symbol]).get(symbol)
+
+    def prefetch(self, symbols=None):
+        """
+        Fetches several rates in one source call, every conversion rate of rate_pair_map by default.
+
+        :return: Dictionary of symbol -> rate of the symbols the source had a price for.
+        """
+        if symbols is None:
+            symbols = rate_pair_map.values()
+        symbols = list(dict.fromkeys(symbols))
+        if not symbols:
+            return {}
+        return {symbol: rate for symbol, rate in self._fetch(symbols).items() if rate is not None}
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._rates.clear()
+            else:
+                self._rates.pop(symbol, None)
+
+
+default_cache = RateCache()
+
+
+def configure(source=None, ttl=DEFAULT_TTL, max_stale=DEFAULT_MAX_STALE, max_size=DEFAULT_MAX_SIZE):
+    """
+    Replaces the shared cache, e.g. configure(source=fixture_source("rates.json")) for offline tests.
+    """
+    global default_cache
+    default_cache = RateCache(source=source or yfinance_source, ttl=ttl, max_stale=max_stale, max_size=max_size)
+    return default_cache
+
+
+@timed("get_current_price")
+def get_current_price(symbol):
+    """
+    Returns the current price of the given symbol from the shared rate cache.
+
+    :param symbol: The ticker symbol of the asset to fetch the current price for.
+    :return: The current price of the asset, or None if not found.
+    """
+    return default_cache.get(symbol)
+
+
+def determine_conversion_symbol(account_base_currency, traded_symbol):
+    """
+    Yahoo symbol of the base -> account currency rate forex_trade_calculator sizes with, None for account currency bases.
+    """
+    base_currency = traded_symbol[:3]
+    if account_base_currency != base_currency:
+        return f"{base_currency}{account_base_currency}=X"
+
+
+def conversion_leg(symbol, account_currency=ACCOUNT_CURRENCY):
+    """
+    Yahoo symbol of the account -> quote currency rate calculate_lot_size sizes with, "" for account currency quotes.
+    """
+    quote = symbol[3:6]
+    return rate_pair_map.get(symbol) or ("" if quote == account_currency else f"{account_currency}{quote}=X")
+
+
+def margin_leg(symbol, account_currency=ACCOUNT_CURRENCY):
+    """
+    Yahoo symbol of the account -> base currency rate the leverage cap uses, "" for account currency bases.
+    """
+    base = symbol[:3]
+    return "" if base == account_currency else f"{account_currency}{base}=X"
+
+
+def sizing_legs(symbols=None, account_currency=ACCOUNT_CURRENCY):
+    """
+    Every rate the sizing functions may fetch for the symbols, the rate_pair_map symbols by default.
+    """
+    legs = []
+    for symbol in symbols or rate_pair_map:
+        legs += [conversion_leg(symbol, account_currency), margin_leg(symbol, account_currency),
+                 determine_conversion_symbol(account_currency, symbol)]
+    return [leg for leg in dict.fromkeys(legs) if leg]
+
+
+def prefetch_rates(symbols=None):
+    """
+    Warms the shared cache in one source call, with sizing_legs() by default so no sizing path waits on the network.
+    """
+    return default_cache.prefetch(sizing_legs() if symbols is None else symbols)
@@ -0,0 +1,177 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MS_PER_DAY = 86_400_000
+SATURDAY = 5  # datetime.weekday() of Saturday; Saturday and Sunday are not trading days
+
+# Session name -> (open, close) UTC time of day, both ends inclusive like the original London filter
+SESSIONS = {
+    "tokyo": ("00:00", "09:00"),
+    "london": ("08:00", "16:00"),
+    "new_york": ("13:00", "22:00"),
+    "tokyo_london": ("08:00", "09:00"),
+    "london_new_york": ("13:00", "16:00"),
+}
+
+# Month-day of the holidays the market is closed every year
+HOLIDAYS = ("01-01", "12-25")
+
+
+def _time_of_day_ms(hh_mm):
+    return pd.Timedelta(f"{hh_mm}:00") // pd.Timedelta(milliseconds=1)
+
+
+def session_windows(sessions=SESSIONS):
+    """
+    Session name -> (open, close) ms of the UTC day, a time is in a session when open <= time <= close.
+    """
+    return {name: (_time_of_day_ms(open_time), _time_of_day_ms(close_time)) for name, (open_time, close_time) in sessions.items()}
+
+
+class SessionCalendar:
+    """
+    Day and session index of a time-ordered tick series, built once per dataset.
+
+    Every day is a row range of the ticks (day_starts), and because the ticks
+    are in time order every session of a day is one row range too. The index
+    only stores those ranges, a few integers per day, so masks and session
+    slices of any length of history come from it without looking at the
+    timestamps again. Weekends and holidays are flagged per day.
+
+    :param days: Day numbers since the epoch (UTC) that have ticks
+    :param day_starts: Row where each day starts, plus the total row count at the end
+    :param trading: Boolean per day, False on weekends and holidays
+    :param session_rows: Session name -> (starts, ends) row arrays, one element per day
+    :param fingerprint: Dictionary identifying the timestamps and settings the index was built from
+    """
+
+    def __init__(self, days, day_starts, trading, session_rows, fingerprint):
+        self.days = days
+        self.day_starts = day_starts
+        self.trading = trading
+        self.session_rows = session_rows
+        self.fingerprint = fingerprint
+
+    @property
+    def rows(self):
+        return int(self.day_starts[-1])
+
+    @staticmethod
+    def _fingerprint(timestamps, sessions, holidays):
+        return {
+            "rows": len(timestamps),
+            "first": int(timestamps[0]) if len(timestamps) else None,
+            "last": int(timestamps[-1]) if len(timestamps) else None,
+            "sessions": {name: list(window) for name, window in sessions.items()},
+            "holidays": sorted(holidays),
+        }
+
+    @classmethod
+    def build(cls, timestamps, sessions=SESSIONS, holidays=HOLIDAYS):
+        """
+        Builds the index from tick times in ms since epoch, ascending.
+
+        :param holidays: Month-days ('12-25') closed every year and/or full dates ('2024-03-29')
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        day_of_tick = timestamps // MS_PER_DAY
+        boundaries = np.flatnonzero(np.diff(day_of_tick)) + 1
+        starts = np.concatenate(([0], boundaries)).astype(np.int64) if len(timestamps) else np.empty(0, dtype=np.int64)
+        days = day_of_tick[starts]
+        day_starts = np.append(starts, len(timestamps)).astype(np.int64)
+
+        dates = pd.DatetimeIndex((days * MS_PER_DAY).astype("datetime64[ms]"))
+        closed = set(holidays)
+        is_holiday = np.array([date.strftime("%m-%d") in closed or date.strftime("%Y-%m-%d") in closed for date in dates],
+                              dtype=bool)
+        trading = (dates.weekday.to_numpy() < SATURDAY) & ~is_holiday
+
+        session_rows = {}
+        for name, (open_time, close_time) in sessions.items():
+            day_ms = days * MS_PER_DAY
+            session_rows[name] = (
+                np.searchsorted(timestamps, day_ms + _time_of_day_ms(open_time), side="left").astype(np.int64),
+                np.searchsorted(timestamps, day_ms + _time_of_day_ms(close_time), side="right").astype(np.int64),
+            )
+        return cls(days, day_starts, trading, session_rows, cls._fingerprint(timestamps, sessions, holidays))
+
+    def save(self, path):
+        arrays = {"days": self.days, "day_starts": self.day_starts, "trading": self.trading}
+        for name, (starts, ends) in self.session_rows.items():
+            arrays[f"{name}.starts"] = starts
+            arrays[f"{name}.ends"] = ends
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, fingerprint=json.dumps(self.fingerprint), **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            fingerprint = json.loads(str(saved["fingerprint"]))
+            session_rows = {name: (saved[f"{name}.starts"], saved[f"{name}.ends"]) for name in fingerprint["sessions"]}
+            return cls(saved["days"], saved["day_starts"], saved["trading"], session_rows, fingerprint)
+
+    @classmethod
+    def cached(cls, timestamps, path, sessions=SESSIONS, holidays=HOLIDAYS):
+        """
+        Loads the index saved at path, or builds and saves it when missing or built from other ticks or settings.
+
+        Only the first and last timestamp are read to check the cache, so a
+        memory-mapped tick column stays on disk when the cache is valid.
+        """
+        if os.path.exists(path):
+            calendar = cls.load(path)
+            if calendar.fingerprint == cls._fingerprint(timestamps, sessions, holidays):
+                return calendar
+        calendar = cls.build(timestamps, sessions, holidays)
+        calendar.save(path)
+        return calendar
+
+    def slice_rows(self, first_row, last_row):
+        """
+        Index of the whole days between two rows, with rows counted from first_row again.
+
+        Gives the calendar of a day range of the ticks, e.g. tick_store.load_ticks with a start and end.
+        """
+        starts = self.day_starts
+        first_day = int(np.searchsorted(starts, first_row))
+        last_day = int(np.searchsorted(starts, last_row))
+        if last_day >= len(starts) or starts[first_day] != first_row or starts[last_day] != last_row:
+            raise ValueError(f"Rows {first_row}-{last_row} don't start and end on day boundaries")
+        session_rows = {name: (session_starts[first_day:last_day] - first_row, session_ends[first_day:last_day] - first_row)
+                        for name, (session_starts, session_ends) in self.session_rows.items()}
+        fingerprint = dict(self.fingerprint, rows=last_row - first_row, slice=[first_row, last_row])
+        return SessionCalendar(self.days[first_day:last_day], starts[first_day:last_day + 1] - first_row,
+                               self.trading[first_day:last_day], session_rows, fingerprint)
+
+    def ranges(self, session=None, trading_days_only=True):
+        """
+        Row ranges of a session, one per day.
+
+        :param session: Key of the sessions the index was built with, None for whole days
+        :param trading_days_only: Leave out weekends and holidays
+        :return: (starts, ends) int64 arrays, empty ranges included.
+        """
+        if session is None:
+            starts, ends = self.day_starts[:-1], self.day_starts[1:]
+        else:
+            try:
+                starts, ends = self.session_rows[session]
+            except KeyError:
+                raise ValueError(f"Unknown session {session}, the calendar has {', '.join(self.session_rows)}") from None
+        if trading_days_only:
+            starts, ends = starts[self.trading], ends[self.trading]
+        return starts, ends
+
+    def mask(self, session=None, trading_days_only=True):
+        """
+        Boolean mask over all ticks, True inside the session.
+        """
+        starts, ends = self.ranges(session, trading_days_only)
+        edges = np.zeros(self.rows + 1, dtype=np.int32)
+        np.add.at(edges, starts, 1)
+        np.add.at(edges, ends, -1)
+        return np.cumsum(edges[:-1]) > 0
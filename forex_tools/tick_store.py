@@ -0,0 +1,227 @@
+import argparse
+import bisect
+import datetime
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .session_calendar import HOLIDAYS, MS_PER_DAY, SESSIONS, SessionCalendar
+
+INDEX_FILE = "index.json"
+CALENDAR_FILE = "calendar.npz"
+TIMESTAMP_DTYPE = "<i8"
+CONVERT_CHUNK_ROWS = 5_000_000
+
+# Column name in the store -> column name in the downloaded tick CSV
+CSV_COLUMNS = {"timestamp": "timestamp", "bid": "bidPrice", "ask": "askPrice"}
+
+Ticks = namedtuple("Ticks", ["timestamp", "bid", "ask"])
+
+
+def _symbol_dir(root, symbol):
+    return os.path.join(root, symbol.upper())
+
+
+def _column_path(root, symbol, column):
+    return os.path.join(_symbol_dir(root, symbol), f"{column}.bin")
+
+
+def _day_string(day_number):
+    return (datetime.date(1970, 1, 1) + datetime.timedelta(days=int(day_number))).isoformat()
+
+
+def read_index(root, symbol):
+    """
+    Reads the index of a symbol: column dtypes, row count and the row range of every day.
+
+    :return: The index dict, or None if the symbol has not been converted yet.
+    """
+    path = os.path.join(_symbol_dir(root, symbol), INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_index(root, symbol, index):
+    path = os.path.join(_symbol_dir(root, symbol), INDEX_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def convert_csv(csv_path, root, symbol, price_dtype="<f8", chunk_rows=CONVERT_CHUNK_ROWS):
+    """
+    Appends a downloaded tick CSV (timestamp in ms, askPrice, bidPrice) to the columnar store.
+
+    Every column is one flat binary file per symbol, days are row ranges in
+    index.json. Ticks must be in time order and newer than what is already stored.
+
+    :param csv_path: Path of the tick CSV
+    :param root: Root directory of the store
+    :param symbol: Symbol the ticks belong to, e.g. EURUSD
+    :param price_dtype: numpy dtype of bid/ask, '<f4' halves the size but rounds the prices
+    :param chunk_rows: Number of CSV rows parsed at a time
+    :return: The updated index dict.
+    """
+    os.makedirs(_symbol_dir(root, symbol), exist_ok=True)
+    index = read_index(root, symbol) or {
+        "symbol": symbol.upper(),
+        "dtypes": {"timestamp": TIMESTAMP_DTYPE, "bid": price_dtype, "ask": price_dtype},
+        "rows": 0,
+        "last_timestamp": None,
+        "days": [],
+    }
+    dtypes = index["dtypes"]
+    files = {column: open(_column_path(root, symbol, column), "ab") for column in CSV_COLUMNS}
+    # Drop anything a failed conversion appended after the last indexed row
+    for column, f in files.items():
+        f.truncate(index["rows"] * np.dtype(dtypes[column]).itemsize)
+    try:
+        reader = pd.read_csv(
+            csv_path,
+            usecols=list(CSV_COLUMNS.values()),
+            dtype={"timestamp": "int64", "bidPrice": "float64", "askPrice": "float64"},
+            chunksize=chunk_rows,
+        )
+        for chunk in reader:
+            timestamps = chunk["timestamp"].to_numpy()
+            if len(timestamps) == 0:
+                continue
+            if index["last_timestamp"] is not None and timestamps[0] < index["last_timestamp"]:
+                raise ValueError(f"{csv_path} overlaps ticks already stored for {symbol} or is not in time order")
+            if np.any(np.diff(timestamps) < 0):
+                raise ValueError(f"{csv_path} is not in time order")
+
+            for column, csv_column in CSV_COLUMNS.items():
+                files[column].write(chunk[csv_column].to_numpy().astype(dtypes[column]).tobytes())
+
+            days = timestamps // MS_PER_DAY
+            boundaries = np.flatnonzero(np.diff(days)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(days)]))
+            for start, end in zip(starts, ends):
+                day = _day_string(days[start])
+                if index["days"] and index["days"][-1][0] == day:
+                    index["days"][-1][2] = index["rows"] + int(end)
+                else:
+                    index["days"].append([day, index["rows"] + int(start), index["rows"] + int(end)])
+            index["rows"] += len(timestamps)
+            index["last_timestamp"] = int(timestamps[-1])
+    finally:
+        for f in files.values():
+            f.close()
+
+    _write_index(root, symbol, index)
+    return index
+
+
+def list_days(root, symbol):
+    index = read_index(root, symbol)
+    return [] if index is None else [day for day, _, _ in index["days"]]
+
+
+def _row_range(index, start, end):
+    days = [day for day, _, _ in index["days"]]
+    first = 0 if start is None else bisect.bisect_left(days, str(start))
+    last = len(days) if end is None else bisect.bisect_right(days, str(end))
+    if first >= last:
+        return 0, 0
+    return index["days"][first][1], index["days"][last - 1][2]
+
+
+def load_ticks(root, symbol, start=None, end=None):
+    """
+    Memory-maps the ticks of a symbol between two days, inclusive.
+
+    Nothing is read from disk until the arrays are touched.
+
+    :param root: Root directory of the store
+    :param symbol: Symbol to load, e.g. EURUSD
+    :param start: First day as 'YYYY-MM-DD' or date, None for the first stored day
+    :param end: Last day as 'YYYY-MM-DD' or date, None for the last stored day
+    :return: Ticks(timestamp, bid, ask) of read-only arrays, timestamp in ms since epoch.
+    """
+    index = read_index(root, symbol)
+    if index is None:
+        raise FileNotFoundError(f"No ticks stored for {symbol} in {root}")
+    first_row, last_row = _row_range(index, start, end)
+    columns = {}
+    for column, dtype in index["dtypes"].items():
+        if index["rows"] == 0:
+            columns[column] = np.empty(0, dtype=dtype)
+            continue
+        array = np.memmap(_column_path(root, symbol, column), dtype=dtype, mode="r", shape=(index["rows"],))
+        columns[column] = array[first_row:last_row]
+    return Ticks(**columns)
+
+
+def load_calendar(root, symbol, start=None, end=None, sessions=SESSIONS, holidays=HOLIDAYS):
+    """
+    Session and calendar index of the stored ticks of a symbol between two days, inclusive.
+
+    The index of all stored ticks is cached next to them in calendar.npz and
+    rebuilt when ticks were appended or the sessions or holidays changed; a
+    day range is sliced out of it, so it matches load_ticks with the same
+    start and end.
+    """
+    timestamps = load_ticks(root, symbol).timestamp
+    calendar = SessionCalendar.cached(timestamps, os.path.join(_symbol_dir(root, symbol), CALENDAR_FILE), sessions, holidays)
+    if start is None and end is None:
+        return calendar
+    return calendar.slice_rows(*_row_range(read_index(root, symbol), start, end))
+
+
+def iter_ticks(root, symbol, start=None, end=None, chunk_rows=1_000_000):
+    """
+    Reads the ticks of a symbol between two days in chunks of at most chunk_rows.
+
+    Chunks are read with plain file reads instead of a memory map, so resident
+    memory stays bounded by the chunk size however long the range is.
+
+    :return: Generator of Ticks, timestamp in ms since epoch.
+    """
+    index = read_index(root, symbol)
+    if index is None:
+        raise FileNotFoundError(f"No ticks stored for {symbol} in {root}")
+    first_row, last_row = _row_range(index, start, end)
+    dtypes = {column: np.dtype(dtype) for column, dtype in index["dtypes"].items()}
+    files = {column: open(_column_path(root, symbol, column), "rb") for column in dtypes}
+    try:
+        for row in range(first_row, last_row, chunk_rows):
+            count = min(chunk_rows, last_row - row)
+            columns = {}
+            for column, dtype in dtypes.items():
+                files[column].seek(row * dtype.itemsize)
+                columns[column] = np.fromfile(files[column], dtype=dtype, count=count)
+            yield Ticks(**columns)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def ticks_to_dataframe(ticks):
+    """
+    Builds the DataFrame layout simulate_trades expects (timestamp index, askPrice, bidPrice).
+    """
+    index = pd.DatetimeIndex(np.asarray(ticks.timestamp).astype("datetime64[ms]"), name="timestamp")
+    return pd.DataFrame({"askPrice": np.asarray(ticks.ask), "bidPrice": np.asarray(ticks.bid)}, index=index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a tick CSV into the columnar tick store")
+    parser.add_argument("csv_path")
+    parser.add_argument("root")
+    parser.add_argument("symbol")
+    parser.add_argument("--float32", action="store_true", help="Store bid/ask as float32")
+    args = parser.parse_args(argv)
+    index = convert_csv(args.csv_path, args.root, args.symbol, price_dtype="<f4" if args.float32 else "<f8")
+    print(f"{index['symbol']}: {index['rows']} ticks, {len(index['days'])} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .bookoo_backtest_engine import PIP, RR_RATIO, first_passage_trades, new_position_state, scan_ticks
+
+META_FILE = "meta.json"
+FLUSH_ROWS = 1_000_000
+
+# Column -> dtype; times in ms since epoch, direction 1 long / -1 short
+TRADE_DTYPES = {
+    "entry_time": "<i8",
+    "exit_time": "<i8",
+    "entry_price": "<f8",
+    "exit_price": "<f8",
+    "direction": "i1",
+    "is_win": "|b1",
+}
+
+Trades = namedtuple("Trades", list(TRADE_DTYPES))
+
+
+class TradeBuffer:
+    """
+    Growable columnar trade list: one preallocated numpy array per column instead of a dict per trade.
+
+    Capacity doubles when full, so appends are amortized O(1) and a million
+    trades take 34 bytes each instead of a dict, two Timestamps and strings.
+
+    :param capacity: Rows preallocated
+    """
+
+    def __init__(self, capacity=1024):
+        self._columns = {column: np.empty(capacity, dtype=dtype) for column, dtype in TRADE_DTYPES.items()}
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def _reserve(self, rows):
+        capacity = len(self._columns["entry_time"])
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2)
+        for column, array in self._columns.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.rows] = array[:self.rows]
+            self._columns[column] = grown
+
+    def append(self, entry_time, exit_time, entry_price, exit_price, direction, is_win):
+        self._reserve(self.rows + 1)
+        row = self.rows
+        for column, value in zip(TRADE_DTYPES, (entry_time, exit_time, entry_price, exit_price, direction, is_win)):
+            self._columns[column][row] = value
+        self.rows += 1
+
+    def extend(self, trades):
+        """
+        Appends Trades of equal length arrays (or anything with the same fields) in one copy per column.
+        """
+        count = len(trades.entry_time)
+        self._reserve(self.rows + count)
+        for column in TRADE_DTYPES:
+            self._columns[column][self.rows:self.rows + count] = getattr(trades, column)
+        self.rows += count
+
+    def clear(self):
+        self.rows = 0
+
+    def trades(self):
+        """
+        Trades of views over the filled rows, valid until the next append.
+        """
+        return Trades(**{column: array[:self.rows] for column, array in self._columns.items()})
+
+
+def trades_to_dataframe(trades):
+    """
+    DataFrame of Trades with datetime64 entry/exit times, for analysis or CSV export.
+    """
+    frame = pd.DataFrame({column: np.asarray(getattr(trades, column)) for column in TRADE_DTYPES})
+    for column in ("entry_time", "exit_time"):
+        frame[column] = frame[column].to_numpy().astype("datetime64[ms]")
+    return frame
+
+
+def trades_to_details(trades):
+    """
+    The trade_details list of dicts simulate_trades returns, for code that still expects it.
+    """
+    entry_times = pd.DatetimeIndex(np.asarray(trades.entry_time).astype("datetime64[ms]"))
+    return [
+        {
+            'entry_time': entry_time,
+            'entry_price': float(entry_price),
+            'exit_price': float(exit_price),
+            'direction': 'long' if direction == 1 else 'short',
+            'outcome': 'win' if is_win else 'lose'
+        }
+        for entry_time, entry_price, exit_price, direction, is_win
+        in zip(entry_times, trades.entry_price, trades.exit_price, trades.direction, trades.is_win)
+    ]
+
+
+def trades_to_details_frame(trades):
+    """
+    DataFrame of Trades in the columns of trade_details: entry_time, entry_price, exit_price,
+    'long'/'short' direction and 'win'/'lose' outcome, for CSV exports in the format of create_csv_from_trades.
+    """
+    return pd.DataFrame({
+        'entry_time': np.asarray(trades.entry_time).astype("datetime64[ms]"),
+        'entry_price': np.asarray(trades.entry_price),
+        'exit_price': np.asarray(trades.exit_price),
+        'direction': np.where(np.asarray(trades.direction) == 1, 'long', 'short'),
+        'outcome': np.where(np.asarray(trades.is_win), 'win', 'lose'),
+    })
+
+
+def simulate_trade_buffer(timestamps, bid, ask, sl_pip, rr_ratio=RR_RATIO, start_direction='short', pip=PIP):
+    """
+    simulate_trades straight into a TradeBuffer, without building a dict per trade.
+
+    :param timestamps: Tick times in ms since epoch
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    bid = np.asarray(bid, dtype=np.float64)
+    ask = np.asarray(ask, dtype=np.float64)
+    entry_idx, exit_idx, entry_prices, directions, wins = first_passage_trades(
+        bid, ask, sl_pip, pip=pip, start_direction=start_direction, rr_ratio=rr_ratio)
+    buffer = TradeBuffer(capacity=max(len(entry_idx), 1))
+    buffer.extend(Trades(
+        entry_time=timestamps[entry_idx],
+        exit_time=timestamps[exit_idx],
+        entry_price=entry_prices,
+        exit_price=np.where(directions == 1, bid[exit_idx], ask[exit_idx]),
+        direction=directions,
+        is_win=wins,
+    ))
+    return buffer
+
+
+class TradeLogWriter:
+    """
+    Appends trades to an on-disk trade log: one flat binary file per column plus meta.json.
+
+    Trades collect in a TradeBuffer and are written as one block per column
+    every flush_rows trades, so a sweep producing millions of trades keeps
+    only one block in memory. meta.json is rewritten after every flush, bytes
+    a crashed run wrote after the last recorded row are dropped on reopening.
+    Read the log back with read_trade_log.
+
+    :param path: Directory of the log, created if missing
+    :param flush_rows: Trades buffered before writing a block
+    :param append: Append to an existing log at path instead of replacing it
+    """
+
+    def __init__(self, path, flush_rows=FLUSH_ROWS, append=True):
+        self.path = path
+        self.flush_rows = flush_rows
+        os.makedirs(path, exist_ok=True)
+        meta = read_trade_log_meta(path) if append else None
+        meta = meta or {"dtypes": TRADE_DTYPES, "rows": 0}
+        if meta["dtypes"] != TRADE_DTYPES:
+            raise ValueError(f"{path} holds a trade log with different columns")
+        self.rows = meta["rows"]
+        self.buffer = TradeBuffer(capacity=min(flush_rows, 1024))
+        self._files = {column: open(_column_path(path, column), "ab") for column in TRADE_DTYPES}
+        for column, f in self._files.items():
+            f.truncate(self.rows * np.dtype(TRADE_DTYPES[column]).itemsize)
+        _write_meta(path, {"dtypes": TRADE_DTYPES, "rows": self.rows})
+
+    def append(self, *trade):
+        """
+        Appends one trade: entry_time, exit_time, entry_price, exit_price, direction, is_win.
+        """
+        self.buffer.append(*trade)
+        if len(self.buffer) >= self.flush_rows:
+            self.flush()
+
+    def extend(self, trades):
+        self.buffer.extend(trades)
+        if len(self.buffer) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not len(self.buffer):
+            return
+        for column, array in self.buffer.trades()._asdict().items():
+            self._files[column].write(array.tobytes())
+            self._files[column].flush()
+        self.rows += len(self.buffer)
+        self.buffer.clear()
+        _write_meta(self.path, {"dtypes": TRADE_DTYPES, "rows": self.rows})
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for f in self._files.values():
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def _column_path(path, column):
+    return os.path.join(path, f"{column}.bin")
+
+
+def read_trade_log_meta(path):
+    """
+    Column dtypes and row count of a trade log, None if there is none at path.
+    """
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    meta_path = os.path.join(path, META_FILE)
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp_path, meta_path)
+
+
+def read_trade_log(path):
+    """
+    Memory-maps a trade log written by TradeLogWriter.
+
+    :return: Trades of read-only arrays, nothing is read until they are touched.
+    """
+    meta = read_trade_log_meta(path)
+    if meta is None:
+        raise FileNotFoundError(f"No trade log in {path}")
+    columns = {}
+    for column, dtype in meta["dtypes"].items():
+        if meta["rows"] == 0:
+            columns[column] = np.empty(0, dtype=dtype)
+        else:
+            columns[column] = np.memmap(_column_path(path, column), dtype=dtype, mode="r", shape=(meta["rows"],))
+    return Trades(**columns)
+
+
+def iter_trade_blocks(chunks, sl_pip, rr_ratio=RR_RATIO, start_direction='short', pip=PIP):
+    """
+    The trades of stream_trades as one Trades of arrays per tick chunk that booked any.
+
+    :param chunks: Iterable of (timestamp, bid, ask) arrays, e.g. tick_store.iter_ticks
+    :return: Generator of Trades.
+    """
+    state = new_position_state(sl_pip, pip=pip, start_direction=start_direction, rr_ratio=rr_ratio)
+    for timestamps, bid, ask in chunks:
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        base = state['offset']
+        booked = scan_ticks(np.asarray(bid, dtype=np.float64), np.asarray(ask, dtype=np.float64), state, timestamps)
+        if not booked:
+            continue
+        _, exit_offsets, entry_times, entry_prices, exit_prices, directions, wins = zip(*booked)
+        yield Trades(
+            entry_time=np.array(entry_times, dtype=np.int64),
+            # Trades are booked on a tick of the current chunk
+            exit_time=timestamps[np.array(exit_offsets, dtype=np.int64) - base],
+            entry_price=np.array(entry_prices, dtype=np.float64),
+            exit_price=np.array(exit_prices, dtype=np.float64),
+            direction=np.array(directions, dtype=np.int8),
+            is_win=np.array(wins, dtype=bool),
+        )
+
+
+def stream_trade_log(chunks, path, sl_pip, rr_ratio=RR_RATIO, start_direction='short', pip=PIP, flush_rows=FLUSH_ROWS):
+    """
+    stream_trades written straight to a new trade log, memory bounded by the tick chunk and flush_rows.
+
+    :param chunks: Iterable of (timestamp, bid, ask) arrays, e.g. tick_store.iter_ticks
+    :param path: Directory of the trade log, a log already there is replaced
+    :return: Number of trades written.
+    """
+    with TradeLogWriter(path, flush_rows, append=False) as writer:
+        for trades in iter_trade_blocks(chunks, sl_pip, rr_ratio, start_direction, pip):
+            writer.extend(trades)
+    return writer.rows
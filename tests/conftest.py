@@ -0,0 +1,61 @@
+import datetime
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from forex_tools.bookoo_backtest_engine import PIP
+
+Position = namedtuple("Position", ["symbol"])
+Tick = namedtuple("Tick", ["time_msc"])
+Deal = namedtuple("Deal", ["ticket", "time", "time_msc", "type", "entry", "volume", "price", "profit", "symbol", "position_id"])
+
+
+class StubTerminal:
+    """
+    positions_get, symbol_info_tick and history_deals_get over a set of open symbols and a list of deals,
+    failing_polls makes positions_get return None.
+    """
+
+    def __init__(self, open_symbols=(), deals=()):
+        self.open = set(open_symbols)
+        self.failing_polls = 0
+        self.tick_msc = 0
+        self.deals = list(deals)
+        self.history_requests = []
+
+    def positions_get(self):
+        if self.failing_polls:
+            self.failing_polls -= 1
+            return None
+        return tuple(Position(symbol) for symbol in sorted(self.open))
+
+    def symbol_info_tick(self, symbol):
+        self.tick_msc += 1
+        return Tick(self.tick_msc)
+
+    def history_deals_get(self, date_from, date_to):
+        # Like MT5, either bound may be a datetime or seconds since the epoch, both in server time
+        self.history_requests.append(date_from)
+        bounds = [(bound - datetime.datetime(1970, 1, 1)).total_seconds() if isinstance(bound, datetime.datetime) else bound
+                  for bound in (date_from, date_to)]
+        return tuple(deal for deal in self.deals if bounds[0] <= deal.time <= bounds[1])
+
+
+def synthetic_ticks(n=6_000, seed=0, start="2023-12-22", interval_ms=60_000, volatility_pips=1.0, spread_pips=0.6):
+    """
+    Seeded random walk of bid/ask ticks in the layout simulate_trades reads, spanning a weekend and Christmas.
+    """
+    rng = np.random.default_rng(seed)
+    mid = 1.08 + np.cumsum(rng.normal(0, volatility_pips * PIP, n))
+    timestamps = pd.Timestamp(start).value // 1_000_000 + np.cumsum(rng.integers(1, 2 * interval_ms, n))
+    index = pd.DatetimeIndex(timestamps.astype("datetime64[ms]"), name="timestamp")
+    half_spread = spread_pips * PIP / 2
+    return pd.DataFrame({"askPrice": mid + half_spread, "bidPrice": mid - half_spread}, index=index)
+
+
+def chunks(df, rows):
+    timestamps = df.index.values.astype("datetime64[ms]").astype(np.int64)
+    for start in range(0, len(df), rows):
+        yield (timestamps[start:start + rows], df["bidPrice"].to_numpy()[start:start + rows],
+               df["askPrice"].to_numpy()[start:start + rows])
@@ -0,0 +1,63 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import chunks, synthetic_ticks
+from forex_tools.bookoo_backtest_engine import evaluate_performance, simulate_trades, simulate_trades_iterrows, stream_trades
+from forex_tools.trade_log import simulate_trade_buffer, trades_to_details_frame
+
+LONDON_OPEN = datetime.time(8, 0)
+LONDON_CLOSE = datetime.time(16, 0)
+
+
+@pytest.fixture(scope="module")
+def ticks():
+    return synthetic_ticks()
+
+
+@pytest.mark.parametrize("start_direction", ["short", "long"])
+@pytest.mark.parametrize("sl_pip", [0.5, 2, 5])
+def test_simulate_trades_matches_iterrows(ticks, sl_pip, start_direction):
+    expected = simulate_trades_iterrows(ticks, sl_pip, start_direction)
+    assert len(expected[0]) > 10
+    assert simulate_trades(ticks, sl_pip, start_direction=start_direction) == expected
+
+
+@pytest.mark.parametrize("start_direction", ["short", "long"])
+def test_simulate_trades_session_matches_filtered_iterrows(ticks, start_direction):
+    # The London session on trading days, both ends inclusive
+    times = ticks.index.time
+    in_session = ((times >= LONDON_OPEN) & (times <= LONDON_CLOSE) & (ticks.index.weekday < 5)
+                  & ~ticks.index.strftime("%m-%d").isin(["01-01", "12-25"]))
+    expected = simulate_trades_iterrows(ticks[in_session], 2, start_direction)
+    assert 0 < len(expected[0])
+    assert simulate_trades(ticks, 2, start_direction=start_direction, session="london") == expected
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 1_000, 100_000])
+@pytest.mark.parametrize("start_direction", ["short", "long"])
+def test_stream_trades_matches_simulate_trades(ticks, chunk_rows, start_direction):
+    _, expected = simulate_trades(ticks, 2, start_direction=start_direction)
+    assert list(stream_trades(chunks(ticks, chunk_rows), 2, start_direction=start_direction)) == expected
+
+
+def test_trade_buffer_exports_trade_details_columns(ticks):
+    _, trade_details = simulate_trades(ticks, 2)
+    timestamps, bid, ask = next(chunks(ticks, len(ticks)))
+    frame = trades_to_details_frame(simulate_trade_buffer(timestamps, bid, ask, 2).trades())
+    pd.testing.assert_frame_equal(frame, pd.DataFrame(trade_details), check_dtype=False)
+
+
+def test_evaluate_performance_matches_array_sharpe():
+    trades = ["win", "lose", "lose", "win", "lose"]
+    returns = np.array([1 if trade == "win" else -1 for trade in trades])
+    win_ratio, sharpe_ratio, wins, losses = evaluate_performance(trades)
+    assert (win_ratio, wins, losses) == (0.4, 2, 3)
+    assert sharpe_ratio == pytest.approx(returns.mean() / returns.std())
+
+
+def test_evaluate_performance_without_trades():
+    # The array version divided by the std of no returns and gave nan
+    assert evaluate_performance([]) == (0, 0, 0, 0)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from conftest import chunks, synthetic_ticks
+from forex_tools.bar_engine import BarBuilder, fill_gap_candles, resample_ticks
+from forex_tools.tick_store import Ticks
+
+
+@pytest.fixture(scope="module")
+def ticks():
+    timestamps, bid, ask = next(chunks(synthetic_ticks(n=3_000, interval_ms=20_000), 3_000))
+    # A day without ticks in the middle, no timeframe has a bar for it
+    timestamps = timestamps + np.where(np.arange(len(timestamps)) >= 1_500, 86_400_000, 0)
+    return Ticks(timestamps, bid, ask)
+
+
+def assert_same_bars(bars, expected):
+    for column in expected._fields:
+        np.testing.assert_array_equal(getattr(bars, column), getattr(expected, column), err_msg=column)
+
+
+def tick_by_tick(ticks, builder):
+    for timestamp, bid, ask in zip(ticks.timestamp.tolist(), ticks.bid.tolist(), ticks.ask.tolist()):
+        builder.update(timestamp, bid, ask)
+    return builder
+
+
+def chunked(ticks, builder, rows):
+    for start in range(0, len(ticks.timestamp), rows):
+        builder.update_many(*(column[start:start + rows] for column in ticks))
+    return builder
+
+
+@pytest.mark.parametrize("price", ["bid", "mid"])
+@pytest.mark.parametrize("timeframe", ["1min", "15min", "4h"])
+def test_batch_tick_and_chunked_bars_are_identical(ticks, timeframe, price):
+    expected = resample_ticks(ticks, timeframe, price)
+    assert np.diff(expected.time).max() > BarBuilder(timeframe).length
+
+    completed = []
+    builders = [tick_by_tick(ticks, BarBuilder(timeframe, price, on_bar=completed.append))]
+    builders += [chunked(ticks, BarBuilder(timeframe, price), rows) for rows in (1, 7, 500)]
+    for builder in builders:
+        bars = builder.to_bars(include_current=True)
+        assert_same_bars(bars, expected)
+        # Fill gap candles of bookoo_indicator.pine, the forming one from the builder's previous close
+        candles = fill_gap_candles(expected)
+        assert_same_bars(fill_gap_candles(bars), candles)
+        assert builder.fill_gap() == tuple(getattr(candles, column)[-1] for column in ("open", "high", "low", "close", "bullish"))
+    assert completed == list(builders[0].bars)
+    assert len(completed) == len(expected.time) - 1
+
+
+def test_first_fill_gap_candle_has_no_open():
+    builder = BarBuilder("1min")
+    assert builder.fill_gap() is None
+    builder.update(0, 1.1, 1.2)
+    open_, high, low, close, bullish = builder.fill_gap()
+    assert np.isnan(open_) and (high, low, close, bullish) == (1.1, 1.1, 1.1, False)
+    builder.update(60_000, 1.3, 1.4)
+    assert builder.fill_gap() == (1.1, 1.3, 1.3, 1.3, True)
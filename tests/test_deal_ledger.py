@@ -0,0 +1,71 @@
+import datetime
+import json
+
+import pytest
+
+from conftest import Deal, StubTerminal
+from forex_tools.deal_ledger import DealLedger
+
+NOW = datetime.datetime(2024, 1, 2, 12, 0)
+NOW_S = int((NOW - datetime.datetime(1970, 1, 1)).total_seconds())
+
+
+def deal(ticket, seconds_ago, profit, symbol="EURUSD"):
+    time_s = NOW_S - seconds_ago
+    return Deal(ticket=ticket, time=time_s, time_msc=time_s * 1000 + ticket, type=0, entry=1, volume=0.1,
+                price=1.1, profit=profit, symbol=symbol, position_id=ticket)
+
+
+def test_sync_reads_only_the_deals_after_the_cursor():
+    terminal = StubTerminal(deals=[deal(1, 3 * 86_400, 5.0), deal(2, 600, -1.0), deal(3, 600, 3.0, "USDJPY")])
+    ledger = DealLedger(terminal, now=lambda: NOW)
+
+    # The first sync looks back lookback_days, the deal three days ago is left out
+    assert ledger.sync() == 2
+    assert terminal.history_requests[0] == NOW - datetime.timedelta(days=2)
+    assert (ledger.cursor_time, ledger.cursor_ticket) == (NOW_S - 600, 3)
+
+    # Deals of the cursor's second are returned again but counted once, a new one in that second is added
+    terminal.deals += [deal(4, 600, 2.0), deal(5, 60, -0.5)]
+    assert ledger.sync() == 2
+    assert terminal.history_requests[1] == NOW_S - 600
+    assert ledger.sync() == 0
+    assert ledger.last_deal("EURUSD").ticket == 5
+    assert ledger.profit("EURUSD") == pytest.approx(0.5)
+    assert ledger.symbols["EURUSD"]["deals"] == 3
+    assert ledger.last_deal("GBPUSD") is None and ledger.profit("GBPUSD") == 0.0
+
+
+def test_no_history_is_not_an_empty_sync():
+    terminal = StubTerminal()
+    terminal.history_deals_get = lambda date_from, date_to: None
+    ledger = DealLedger(terminal, now=lambda: NOW)
+    assert ledger.sync() is None
+    assert ledger.cursor_time is None
+
+
+def test_saved_ledger_is_restored_and_continues_from_its_cursor(tmp_path):
+    path = tmp_path / "deal_ledger.json"
+    terminal = StubTerminal(deals=[deal(1, 600, -1.0), deal(2, 300, 4.0, "USDJPY")])
+    ledger = DealLedger(terminal, path=str(path), now=lambda: NOW)
+
+    # Syncing leaves the file alone, save writes it once per batch of new deals
+    ledger.sync()
+    assert not path.exists()
+    ledger.save()
+    saved = path.stat().st_mtime_ns
+    ledger.sync()
+    ledger.save()
+    assert path.stat().st_mtime_ns == saved
+
+    restored = DealLedger(terminal, path=str(path), now=lambda: NOW)
+    assert (restored.cursor_time, restored.cursor_ticket) == (ledger.cursor_time, ledger.cursor_ticket)
+    assert restored.symbols == ledger.symbols
+    assert json.loads(path.read_text())["cursor_ticket"] == 2
+
+    # A restored ledger doesn't count the saved deals again
+    terminal.deals.append(deal(3, 60, 1.5))
+    assert restored.sync() == 1
+    assert terminal.history_requests[-1] == NOW_S - 300
+    assert restored.profit("EURUSD") == pytest.approx(0.5)
+    assert restored.last_deal("EURUSD").ticket == 3
@@ -0,0 +1,102 @@
+import sys
+
+import numpy as np
+import pytest
+
+from forex_tools import mt5_dao, mt5_replay, rate_provider
+from forex_tools.deal_ledger import LedgerDeal
+from forex_tools.mt5_replay import ReplayTerminal
+from forex_tools.tick_store import Ticks
+
+START_MS = 1_704_182_400_000  # 2024-01-02 08:00 UTC
+
+
+def random_walk_ticks(n, price, pip, start_ms=START_MS, seed=0):
+    rng = np.random.default_rng(seed)
+    mid = price + np.cumsum(rng.normal(0, pip, n))
+    timestamps = start_ms + np.cumsum(rng.integers(500, 1_500, n))
+    return Ticks(timestamps, mid - pip / 4, mid + pip / 4)
+
+
+@pytest.fixture
+def replay_env(monkeypatch, tmp_path):
+    # The replay installs its terminal module-wide, put everything back afterwards
+    monkeypatch.setenv("BOOKOO_LOG_DIR", str(tmp_path))
+    monkeypatch.delitem(sys.modules, "MetaTrader5", raising=False)
+    monkeypatch.setattr(rate_provider, "default_cache", rate_provider.default_cache)
+    monkeypatch.setattr(mt5_dao, "mt5", mt5_dao.mt5)
+
+
+def test_cross_rate_chains_replayed_pairs():
+    terminal = ReplayTerminal({"EURUSD": random_walk_ticks(10, 1.08, 0.0001), "USDJPY": random_walk_ticks(10, 150.0, 0.01)})
+    _, _, eurusd_bid, eurusd_ask = terminal._current("EURUSD")
+    _, _, usdjpy_bid, usdjpy_ask = terminal._current("USDJPY")
+    expected = (eurusd_bid + eurusd_ask) / 2 * (usdjpy_bid + usdjpy_ask) / 2
+    assert terminal.rate_source(["EURJPY=X"])["EURJPY=X"] == pytest.approx(expected)
+
+
+def test_unconvertible_currency_is_rejected():
+    with pytest.raises(ValueError, match="EURUSD"):
+        ReplayTerminal({"USDJPY": random_walk_ticks(10, 150.0, 0.01)})
+    terminal = ReplayTerminal({"USDJPY": random_walk_ticks(10, 150.0, 0.01)}, conversion_rates={"USD": 1.1})
+    assert terminal._cross_rate("EUR", "JPY") == pytest.approx(1.1 * terminal._cross_rate("USD", "JPY"))
+
+
+def test_replays_two_symbols_sharing_one_account(replay_env):
+    ticks = {
+        # The conversion pair starts an hour after the JPY pair
+        "EURUSD": random_walk_ticks(20_000, 1.08, 0.0001, START_MS + 3_600_000, seed=1),
+        "USDJPY": random_walk_ticks(20_000, 150.0, 0.01, seed=2),
+    }
+    terminal = ReplayTerminal(ticks)
+    assert terminal.now_ms == ticks["EURUSD"].timestamp[0]
+
+    strategies = mt5_replay.replay_bot(terminal, ["EURUSD", "USDJPY"], stop_loss_pips=5, start_direction="SHORT")
+
+    closing = [deal for deal in terminal.deals if deal.entry == terminal.DEAL_ENTRY_OUT]
+    for strategy in strategies:
+        closed = [deal for deal in closing if deal.symbol == strategy.symbol]
+        assert len(closed) > 5, strategy.symbol
+        # The last close may come after the final poll
+        assert len(closed) - 1 <= strategy.performance.trades <= len(closed)
+    assert terminal.balance == pytest.approx(mt5_replay.DEFAULT_BALANCE + sum(deal.profit for deal in closing))
+
+
+def test_closing_deal_is_counted_once_at_the_entry_time(replay_env, monkeypatch):
+    terminal = ReplayTerminal({"EURUSD": random_walk_ticks(10, 1.08, 0.0001)})
+    bot = mt5_replay.load_bot(terminal)
+    strategy = bot.BookooStrategy("EURUSD", 5, "SHORT", clock=terminal.utc_time)
+    strategy.is_first_position = False
+    strategy.entry_time_ms = START_MS + 2 * 3_600_000  # 10:00 UTC, London only
+    # Closed at 23:00 server time, outside every session
+    closing_deal = LedgerDeal(ticket=7, time=0, time_msc=START_MS + 15 * 3_600_000, type=terminal.ORDER_TYPE_BUY,
+                              entry=terminal.DEAL_ENTRY_OUT, volume=0.1, price=1.08, profit=-2.5, symbol="EURUSD")
+    monkeypatch.setattr(bot, "get_last_position", lambda symbol: closing_deal)
+    monkeypatch.setattr(bot, "enter_position", lambda *args: None)
+
+    # A rejected re-entry is retried, on_flat then reads the same closing deal again
+    strategy.on_flat()
+    strategy.on_flat()
+    assert strategy.performance.trades == 1
+    assert strategy.performance.session_profit == {"tokyo": 0.0, "london": -2.5, "new_york": 0.0,
+                                                   "tokyo_london": 0.0, "london_new_york": 0.0}
+    assert strategy.entry_time_ms == terminal.now_ms
+
+
+def test_order_prices_are_rounded_to_the_symbol_digits(replay_env, monkeypatch):
+    terminal = ReplayTerminal({"USDJPY": random_walk_ticks(10, 150.0, 0.01)}, conversion_rates={"USD": 1.1})
+    mt5_dao.mt5 = terminal
+    mt5_dao.invalidate_symbol_info()
+    requests = []
+    order_send = terminal.order_send
+    monkeypatch.setattr(terminal, "order_send", lambda request: requests.append(request) or order_send(request))
+
+    mt5_dao.send_order(mt5_dao.prepare_order(0.1, "USDJPY", True, 2.5))
+    request = requests[0]
+    # The recorded ask has more decimals than the symbol's 3
+    assert request["price"] != terminal.symbol_info_tick("USDJPY").ask
+    for key in ("price", "sl", "tp"):
+        assert request[key] == round(request[key], 3), key
+    assert request["sl"] == pytest.approx(request["price"] - 0.025, abs=0.001)
+    assert request["tp"] == pytest.approx(request["price"] + 0.075, abs=0.001)
+    mt5_dao.invalidate_symbol_info()
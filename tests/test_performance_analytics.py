@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forex_tools.performance_analytics import PerformanceTracker, trade_performance
+from forex_tools.session_calendar import SESSIONS, SessionCalendar
+
+# Weekdays only, so the calendar's trading day filter keeps every trade
+ENTRY_TIMES = pd.to_datetime([
+    "2024-01-02 00:00:00.000", "2024-01-02 07:59:59.999", "2024-01-02 08:00:00.000", "2024-01-02 09:00:00.000",
+    "2024-01-02 09:00:00.001", "2024-01-02 13:00:00.000", "2024-01-02 16:00:00.000", "2024-01-02 16:00:00.001",
+    "2024-01-02 22:00:00.000", "2024-01-02 22:30:00.000", "2024-01-03 15:59:59.000", "2024-01-03 23:59:59.999",
+])
+
+
+@pytest.fixture
+def trades():
+    rng = np.random.default_rng(0)
+    return [{"entry_time": entry_time, "entry_price": 1.1, "exit_price": 1.1 + rng.normal(0, 0.001),
+             "direction": "long" if rng.random() < 0.5 else "short", "outcome": "win" if rng.random() < 0.5 else "lose"}
+            for entry_time in ENTRY_TIMES]
+
+
+def test_sessions_match_session_calendar(trades):
+    calendar = SessionCalendar.build(ENTRY_TIMES.values.astype("datetime64[ms]").astype(np.int64))
+    _, summary = trade_performance(trades)
+    for session in SESSIONS:
+        assert summary["session_trades"][session] == np.count_nonzero(calendar.mask(session)), session
+
+
+def test_tracker_matches_trade_performance(trades):
+    tracker = PerformanceTracker()
+    for trade in trades:
+        tracker.update_trade(trade, lot_size=1.0)
+    _, expected = trade_performance(trades)
+    summary = tracker.summary()
+    assert summary["session_trades"] == expected["session_trades"]
+    assert summary["session_profit"] == pytest.approx(expected["session_profit"])
+    for key in ["trades", "wins", "losses", "longest_win_streak", "longest_loss_streak"]:
+        assert summary[key] == expected[key], key
+    for key in ["profit", "mean", "std", "sharpe_ratio", "max_drawdown"]:
+        assert summary[key] == pytest.approx(expected[key]), key
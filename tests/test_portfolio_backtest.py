@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from forex_tools.portfolio_backtest import portfolio_backtest
+
+START_MS = 1_704_182_400_000  # 2024-01-02 08:00 UTC
+SL_PIPS = 2
+
+
+def random_walk(n, price, pip, offset_ms, seed):
+    rng = np.random.default_rng(seed)
+    mid = price + np.cumsum(rng.normal(0, pip, n))
+    # Even ms for one symbol and odd for the other, so no two ticks share a time
+    timestamps = START_MS + offset_ms + np.arange(n, dtype=np.int64) * 1_000
+    return timestamps, mid - pip / 4, mid + pip / 4
+
+
+@pytest.fixture(scope="module")
+def ticks():
+    return {"EURUSD": random_walk(5_000, 1.08, 0.0001, 0, seed=1),
+            "USDJPY": random_walk(5_000, 150.0, 0.01, 501, seed=2)}
+
+
+def sources(ticks):
+    # Two chunks per symbol, read again on every call
+    return {symbol: lambda arrays=arrays: [tuple(column[:2_000] for column in arrays),
+                                           tuple(column[2_000:] for column in arrays)]
+            for symbol, arrays in ticks.items()}
+
+
+def mid_at(ticks, symbol, time_ms):
+    timestamps, bid, ask = ticks[symbol]
+    row = np.searchsorted(timestamps, time_ms, side="right") - 1
+    return (bid[row] + ask[row]) / 2
+
+
+def quote_rate(ticks, symbol, time_ms):
+    # EUR -> quote currency: EURUSD directly, JPY as the EURUSD x USDJPY cross
+    rate = mid_at(ticks, "EURUSD", time_ms)
+    return rate * mid_at(ticks, "USDJPY", time_ms) if symbol == "USDJPY" else rate
+
+
+def test_trades_are_booked_in_time_order_at_the_tick_rates(ticks):
+    result = portfolio_backtest(sources(ticks), SL_PIPS, account_currency="EUR", leverage=1_000)
+    trades = result.trades
+    assert set(trades.symbol) == {"EURUSD", "USDJPY"}
+    assert result.summary["skipped_entries"] == 0
+    entry_ms = trades.entry_time.to_numpy().astype("datetime64[ms]").astype(np.int64)
+    exit_ms = trades.exit_time.to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+    # The frame is in exit order, every balance is the previous one plus the trade's P&L
+    assert np.all(np.diff(exit_ms) > 0)
+    np.testing.assert_allclose(trades.balance, 10_000 + np.cumsum(trades.pnl))
+
+    for i, trade in enumerate(trades.itertuples()):
+        pip = 0.01 if trade.symbol == "USDJPY" else 0.0001
+        # Sized from the balance after every exit up to the entry tick, at that tick's rate
+        balance = 10_000 + trades.pnl[exit_ms <= entry_ms[i]].sum()
+        pip_value = pip / quote_rate(ticks, trade.symbol, entry_ms[i])
+        assert trade.lots == pytest.approx(round(balance * 0.01 / (SL_PIPS * pip_value * 100_000), 2)), i
+        # Booked at the exit tick's rate
+        direction = 1 if trade.direction == "long" else -1
+        expected_pnl = (trade.exit_price - trade.entry_price) * direction * trade.lots * 100_000 / quote_rate(ticks, trade.symbol, exit_ms[i])
+        assert trade.pnl == pytest.approx(expected_pnl), i
+    assert result.summary["balance"] == pytest.approx(trades.balance.iloc[-1])
+
+
+def test_entries_without_free_margin_are_skipped(ticks):
+    # Without leverage a lot's margin is its whole base currency value. EURUSD enters first and takes
+    # the balance down to less free margin than MIN_LOT of USDJPY needs, and as the strategy re-enters
+    # on the tick of every exit it keeps it
+    result = portfolio_backtest(sources(ticks), SL_PIPS, account_currency="EUR", leverage=1, risk_percent=50,
+                                starting_balance=10_500)
+    trades = result.trades
+    usdjpy = trades[trades.symbol == "USDJPY"]
+    eurusd = trades[trades.symbol == "EURUSD"]
+    assert result.summary["skipped_entries"] == len(usdjpy) > 0
+    assert result.summary["symbol_trades"] == {"EURUSD": len(eurusd), "USDJPY": 0}
+    assert (usdjpy.pnl == 0).all() and usdjpy.balance.isna().all()
+
+    # The risk would buy hundreds of lots, the free margin caps EURUSD at the balance
+    balance_before = np.concatenate(([10_500], eurusd.balance.to_numpy()[:-1]))
+    np.testing.assert_array_equal(eurusd.lots, np.floor(balance_before / 1_000) / 100)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from forex_tools import rate_provider
+from forex_tools.forex_calculators import calculate_lot_size, forex_trade_calculator
+from forex_tools.position_sizing import batch_lot_sizes
+
+EURUSD, EURJPY, EURGBP = 1.08, 160.0, 0.86
+# Every leg the calculators ask for, the base -> account ones of forex_trade_calculator as inverses
+RATES = {"EURUSD=X": EURUSD, "EURJPY=X": EURJPY, "EURGBP=X": EURGBP,
+         "USDEUR=X": 1 / EURUSD, "GBPEUR=X": 1 / EURGBP}
+SYMBOLS = ["EURUSD", "USDJPY", "GBPJPY", "EURGBP", "GBPUSD"]
+
+
+@pytest.fixture(autouse=True)
+def fixed_rates(monkeypatch):
+    monkeypatch.setattr(rate_provider, "default_cache", rate_provider.default_cache)
+    rate_provider.configure(source=lambda legs: {leg: RATES.get(leg) for leg in legs})
+
+
+def test_batch_matches_calculate_lot_size():
+    rng = np.random.default_rng(0)
+    symbols = rng.choice(SYMBOLS, 200)
+    balances = rng.uniform(1_000, 100_000, 200)
+    risks = rng.uniform(0.25, 2, 200)
+    stop_losses = rng.uniform(2, 50, 200)
+
+    batch = batch_lot_sizes(symbols, balances, risks, stop_losses, rates=RATES)
+    scalar = [calculate_lot_size(balances[i], risks[i], stop_losses[i], symbols[i]) for i in range(200)]
+    np.testing.assert_allclose(batch["lot_size"], [row[0] for row in scalar])
+    np.testing.assert_allclose(batch["change_per_pip"], [row[1] for row in scalar])
+    np.testing.assert_allclose(batch["money_at_risk"], [row[2] for row in scalar])
+
+
+def test_jpy_pip_is_converted_from_yen():
+    # 1% of 10000 EUR over 10 pips of 0.01 JPY on 100000 units, priced at EURJPY
+    lot_size, _, money_at_risk = calculate_lot_size(10_000, 1, 10, "USDJPY")
+    assert lot_size == round(100 / (10 * 0.01 / EURJPY * 100_000), 2) == 1.6
+    assert money_at_risk == pytest.approx(100)
+    batch = batch_lot_sizes(["USDJPY"], 10_000, 1, 10, rates=RATES)
+    assert batch["lot_size"][0] == lot_size
+
+
+def test_leverage_caps_the_lot_size():
+    balances = np.array([10_000.0, 10_000.0, 500.0])
+    batch = batch_lot_sizes(["EURUSD", "USDJPY", "GBPJPY"], balances, 1, 2, leverage=[30, 30, 5], rates=RATES)
+    expected = [forex_trade_calculator(symbol, leverage, "EUR", balance, 1, 2)["maximum_lot_size"]
+                for symbol, balance, leverage in zip(["EURUSD", "USDJPY", "GBPJPY"], balances, [30, 30, 5])]
+    np.testing.assert_allclose(batch["max_lot_size"], expected)
+    # 1% over 2 pips needs more than the small account's leverage allows
+    assert batch["lot_size"][2] > batch["max_lot_size"][2]
+    np.testing.assert_array_equal(batch["capped_lot_size"], np.minimum(batch["lot_size"], batch["max_lot_size"]))
+    assert np.isinf(batch_lot_sizes(["EURUSD"], 10_000, 1, 2, rates=RATES)["max_lot_size"]).all()
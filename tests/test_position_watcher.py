@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from conftest import StubTerminal
+from forex_tools.position_watcher import PositionWatcher
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_watcher(terminal, handlers, clock, **kwargs):
+    return PositionWatcher(terminal, handlers, min_interval=0.125, backoff_factor=2, max_retry_interval=1.0,
+                           clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def poll(watcher, clock, seconds=0.125):
+    asyncio.run(watcher.poll())
+    clock.now += seconds
+
+
+def test_reenters_when_the_position_closes():
+    terminal, clock = StubTerminal(["EURUSD"]), Clock()
+    calls = []
+
+    def on_flat():
+        calls.append(clock())
+        clock.now += 0.02  # Sizing and sending the order
+        terminal.open.add("EURUSD")
+
+    watcher = make_watcher(terminal, {"EURUSD": on_flat}, clock)
+    poll(watcher, clock, 0.3)
+    assert calls == []
+
+    terminal.open.clear()
+    poll(watcher, clock)
+    assert calls == [pytest.approx(0.3)]
+    watch = watcher.watches["EURUSD"]
+    # Measured from the poll that saw the close, which was at most one poll interval after it
+    assert watch.reentry_latencies == [pytest.approx(0.02)]
+    assert watch.detection_windows == [pytest.approx(0.3)]
+
+    poll(watcher, clock)
+    assert len(calls) == 1
+
+
+def test_flat_symbol_retries_with_growing_backoff_and_resets():
+    terminal, clock = StubTerminal(), Clock()
+    calls = []
+
+    def on_flat():
+        calls.append(clock())
+        if len(calls) == 6:
+            terminal.open.add("EURUSD")
+
+    watcher = make_watcher(terminal, {"EURUSD": on_flat}, clock)
+    while len(calls) < 6:
+        poll(watcher, clock, 0.0625)
+    gaps = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    # Each retry waits 0.125, 0.25, 0.5, 1.0 and the 1.0 cap
+    assert gaps == [0.125, 0.25, 0.5, 1.0, 1.0]
+    assert watcher.watches["EURUSD"].retry_interval == 0.125
+
+    # After the next close the first retry again comes after the minimum interval
+    terminal.open.clear()
+    del calls[:]
+    while len(calls) < 2:
+        poll(watcher, clock, 0.0625)
+    assert calls[1] - calls[0] == 0.125
+
+
+def test_failing_handler_backs_off_without_stopping_the_others():
+    terminal, clock = StubTerminal(), Clock()
+    failures = []
+    entries = []
+
+    def broken():
+        failures.append(clock())
+        raise AttributeError("'NoneType' object has no attribute 'profit'")
+
+    def working():
+        entries.append(clock())
+        terminal.open.add("GBPUSD")
+
+    watcher = make_watcher(terminal, {"EURUSD": broken, "GBPUSD": working}, clock)
+    for _ in range(16):
+        poll(watcher, clock, 0.0625)
+        # Every GBPUSD position closes right away
+        terminal.open.discard("GBPUSD")
+    assert [later - earlier for earlier, later in zip(failures, failures[1:])] == [0.125, 0.25, 0.5]
+    assert len(entries) == 16
+
+
+def test_no_answer_from_positions_get_is_retried_without_reentering():
+    terminal, clock = StubTerminal(["EURUSD", "GBPUSD"]), Clock()
+    calls = []
+    watcher = make_watcher(terminal, {"EURUSD": lambda: calls.append("EURUSD"),
+                                      "GBPUSD": lambda: calls.append("GBPUSD")}, clock)
+    poll(watcher, clock)
+
+    terminal.failing_polls = 2
+    assert asyncio.run(watcher.poll()) == 0.125
+    assert asyncio.run(watcher.poll()) == 0.125
+    assert calls == []
+
+    terminal.open.discard("GBPUSD")
+    poll(watcher, clock)
+    assert calls == ["GBPUSD"]
+
+
+def test_coroutine_handlers_are_awaited():
+    terminal, clock = StubTerminal(), Clock()
+
+    async def on_flat():
+        terminal.open.add("EURUSD")
+
+    watcher = make_watcher(terminal, {"EURUSD": on_flat}, clock)
+    poll(watcher, clock)
+    assert watcher.watches["EURUSD"].had_position
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import synthetic_ticks
+from forex_tools.bookoo_backtest_engine import simulate_trades
+from forex_tools.bookoo_sweep import build_grid, run_sweep
+from forex_tools.session_calendar import SessionCalendar
+from forex_tools.tick_store import convert_csv, load_calendar, load_ticks, ticks_to_dataframe
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    ticks = synthetic_ticks()
+    root = tmp_path_factory.mktemp("store")
+    csv_path = root / "ticks.csv"
+    pd.DataFrame({
+        "timestamp": ticks.index.values.astype("datetime64[ms]").astype(np.int64),
+        "askPrice": ticks["askPrice"].to_numpy(),
+        "bidPrice": ticks["bidPrice"].to_numpy(),
+    }).to_csv(csv_path, index=False)
+    convert_csv(str(csv_path), str(root), "EURUSD")
+    return str(root)
+
+
+def assert_same_calendar(calendar, expected):
+    np.testing.assert_array_equal(calendar.days, expected.days)
+    np.testing.assert_array_equal(calendar.day_starts, expected.day_starts)
+    np.testing.assert_array_equal(calendar.trading, expected.trading)
+    for session in expected.session_rows:
+        np.testing.assert_array_equal(calendar.mask(session), expected.mask(session))
+
+
+def test_load_calendar_of_a_day_range_matches_building_it(store):
+    calendar = load_calendar(store, "EURUSD", start="2023-12-24", end="2023-12-26")
+    timestamps = load_ticks(store, "EURUSD", start="2023-12-24", end="2023-12-26").timestamp
+    assert calendar.rows == len(timestamps) > 0
+    assert_same_calendar(calendar, SessionCalendar.build(timestamps))
+
+
+def test_slice_rows_rejects_rows_inside_a_day(store):
+    calendar = load_calendar(store, "EURUSD")
+    with pytest.raises(ValueError):
+        calendar.slice_rows(1, calendar.rows)
+
+
+def test_calendar_of_other_ticks_is_rejected(store):
+    df = ticks_to_dataframe(load_ticks(store, "EURUSD", start="2023-12-26"))
+    calendar = load_calendar(store, "EURUSD")
+    with pytest.raises(ValueError):
+        simulate_trades(df, 2, session="london", calendar=calendar)
+    with pytest.raises(ValueError):
+        run_sweep(df, build_grid([2], sessions=["london"]), processes=1, calendar=calendar)
+
+
+def test_simulate_trades_with_a_sliced_calendar(store):
+    df = ticks_to_dataframe(load_ticks(store, "EURUSD", start="2023-12-26"))
+    calendar = load_calendar(store, "EURUSD", start="2023-12-26")
+    assert simulate_trades(df, 2, session="london", calendar=calendar) == simulate_trades(df, 2, session="london")
+
+
+def test_sweep_over_sessions_matches_simulate_trades(store):
+    df = ticks_to_dataframe(load_ticks(store, "EURUSD"))
+    calendar = load_calendar(store, "EURUSD")
+    results = run_sweep(df, build_grid([2, 3], sessions=["all", "london", "tokyo"]), processes=2, calendar=calendar)
+    for row in results.itertuples():
+        trades, _ = simulate_trades(df, row.sl_pip, session=None if row.session == "all" else row.session, calendar=calendar)
+        assert (row.wins, row.losses) == (trades.count("win"), trades.count("lose")), (row.sl_pip, row.session)
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from conftest import chunks, synthetic_ticks
+from forex_tools.bookoo_backtest_engine import simulate_trades
+from forex_tools.trade_log import (TRADE_DTYPES, Trades, TradeLogWriter, iter_trade_blocks, read_trade_log,
+                                   simulate_trade_buffer, stream_trade_log, trades_to_details)
+
+
+@pytest.fixture(scope="module")
+def ticks():
+    return synthetic_ticks()
+
+
+def concat(blocks):
+    return Trades(**{column: np.concatenate([getattr(block, column) for block in blocks]) for column in TRADE_DTYPES})
+
+
+def assert_same_trades(trades, expected):
+    for column in TRADE_DTYPES:
+        np.testing.assert_array_equal(getattr(trades, column), getattr(expected, column), err_msg=column)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 333, 100_000])
+def test_trade_blocks_match_simulate_trade_buffer(ticks, chunk_rows):
+    expected = simulate_trade_buffer(*next(chunks(ticks, len(ticks))), 2).trades()
+    assert_same_trades(concat(list(iter_trade_blocks(chunks(ticks, chunk_rows), 2))), expected)
+
+
+def test_streamed_log_reads_back_as_simulate_trades(ticks, tmp_path):
+    _, expected = simulate_trades(ticks, 2)
+    # Flushes in the middle of the tick chunks and of the trade blocks
+    assert stream_trade_log(chunks(ticks, 500), str(tmp_path), 2, flush_rows=37) == len(expected) > 100
+    logged = read_trade_log(str(tmp_path))
+    assert isinstance(logged.entry_time, np.memmap)
+    assert trades_to_details(logged) == expected
+
+
+def test_reopened_log_appends_and_drops_unrecorded_bytes(ticks, tmp_path):
+    trades = simulate_trade_buffer(*next(chunks(ticks, len(ticks))), 2).trades()
+    head = Trades(*(column[:50] for column in trades))
+    tail = Trades(*(column[50:] for column in trades))
+    path = str(tmp_path)
+    with TradeLogWriter(path, flush_rows=16) as writer:
+        for trade in zip(*head):
+            writer.append(*trade)
+    assert writer.rows == 50
+
+    # A crashed run wrote part of a block after the last row meta.json recorded
+    with open(tmp_path / "entry_time.bin", "ab") as f:
+        f.write(b"\x01" * 12)
+    with TradeLogWriter(path, flush_rows=16) as writer:
+        writer.extend(tail)
+    assert_same_trades(read_trade_log(path), trades)
+
+    # append=False starts the log over
+    with TradeLogWriter(path, append=False) as writer:
+        writer.extend(head)
+    assert_same_trades(read_trade_log(path), head)
+
+
+def test_log_with_other_columns_or_no_log(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        read_trade_log(str(tmp_path))
+    TradeLogWriter(str(tmp_path)).close()
+    assert len(read_trade_log(str(tmp_path)).exit_time) == 0
+
+    (tmp_path / "meta.json").write_text(json.dumps({"dtypes": {"entry_time": "<i8"}, "rows": 0}))
+    with pytest.raises(ValueError):
+        TradeLogWriter(str(tmp_path))